@@ -0,0 +1,221 @@
+"""
+benchmarks for building and querying the actor graph in bacon_number
+times transform_data and each query function on the pickled databases or on
+synthetic power law databases, and writes the results as json reports
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import pickle
+import random
+import argparse
+import platform
+import tracemalloc
+
+import bacon_number
+
+BACON = 4724
+DATABASES = {
+    "tiny": "resources/tiny.pickle",
+    "small": "resources/small.pickle",
+    "large": "resources/large.pickle",
+}
+
+
+def power_law_database(num_actors, num_films, exponent=2.1, max_cast=12, seed=None):
+    """
+    makes a synthetic raw database [(actor1, actor2, film)...] where how often
+    an actor is cast follows a power law, so a few actors have huge numbers of
+    co-stars like in the real databases. actor 0 is renamed to Kevin Bacon
+    """
+    rng = random.Random(seed)
+    weights = [(rank + 1) ** -(1 / (exponent - 1)) for rank in range(num_actors)]
+    actors = list(range(num_actors))
+    actors[0] = BACON
+    raw_data = []
+    for film in range(num_films):
+        cast_size = min(max_cast, 2 + int(rng.paretovariate(exponent - 1)))
+        cast = set(rng.choices(actors, weights, k=cast_size))
+        cast = list(cast)
+        for actor1, actor2 in zip(cast, cast[1:]):  # chains the cast together
+            raw_data.append((actor1, actor2, film))
+        if len(cast) > 2:
+            raw_data.append((cast[-1], cast[0], film))
+    return raw_data
+
+
+def load_database(name, seed=None):
+    """
+    loads one of the pickled databases by name, or makes a synthetic one from
+    a name like "synthetic:100000" (number of actors, with twice as many films)
+    """
+    if name.startswith("synthetic:"):
+        num_actors = int(name.split(":")[1])
+        return power_law_database(num_actors, 2 * num_actors, seed=seed)
+    with open(DATABASES.get(name, name), "rb") as f:
+        return pickle.load(f)
+
+
+def percentile(times, fraction):
+    """
+    returns the nearest rank percentile of a list of times
+    """
+    ordered = sorted(times)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(times):
+    """
+    turns a list of times (seconds) into a dictionary of latencies in ms
+    """
+    if not times:
+        return {"count": 0}
+    return {
+        "count": len(times),
+        "mean_ms": 1000 * sum(times) / len(times),
+        "p50_ms": 1000 * percentile(times, 0.50),
+        "p99_ms": 1000 * percentile(times, 0.99),
+        "max_ms": 1000 * max(times),
+    }
+
+
+def time_calls(function, arguments):
+    """
+    calls function once for each tuple of arguments and returns the times
+    """
+    times = []
+    for args in arguments:
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def benchmark_build(raw_data):
+    """
+    times transform_data and measures the peak memory it allocates
+    returns the transformed data and a dictionary of results
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    transformed_data = bacon_number.transform_data(raw_data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return transformed_data, {
+        "seconds": elapsed,
+        "peak_memory_mb": peak / 2**20,
+        "actors": len(transformed_data),
+        "credits": len(raw_data),
+    }
+
+
+def benchmark_queries(raw_data, transformed_data, num_queries=100, seed=None):
+    """
+    times every query function on the same random set of queries
+    returns a dictionary mapping each function name to its latencies
+    """
+    rng = random.Random(seed)
+    if BACON in transformed_data:
+        # bacon_path and actor_to_actor_path never return when there is no
+        # path, so queries are only drawn from Kevin Bacon's component (and
+        # never Kevin Bacon himself, who bacon_path can't find either)
+        connected = list(bacon_number.flood_fill_parents(transformed_data, {BACON}))
+        connected.remove(BACON)
+    else:
+        connected = []
+    films = sorted({film for _, _, film in raw_data})
+    results = {}
+    if connected:
+        actors = [(rng.choice(connected),) for _ in range(num_queries)]
+        pairs = [
+            (rng.choice(connected), rng.choice(connected)) for _ in range(num_queries)
+        ]
+        numbers = [(rng.randint(1, 6),) for _ in range(num_queries)]
+        results["bacon_path"] = time_calls(
+            lambda actor: bacon_number.bacon_path(transformed_data, actor), actors
+        )
+        results["actor_to_actor_path"] = time_calls(
+            lambda actor1, actor2: bacon_number.actor_to_actor_path(
+                transformed_data, actor1, actor2
+            ),
+            pairs,
+        )
+        results["actors_with_bacon_number"] = time_calls(
+            lambda n: bacon_number.actors_with_bacon_number(transformed_data, n),
+            numbers,
+        )
+        if os.path.exists("resources/movies.pickle"):
+            # movie_path rebuilds the graph on every call, so it gets fewer runs
+            results["movie_path"] = time_calls(
+                lambda actor1, actor2: bacon_number.movie_path(
+                    raw_data, actor1, actor2
+                ),
+                pairs[: max(1, num_queries // 10)],
+            )
+    if len(films) > 1:
+        film_pairs = [tuple(rng.sample(films, 2)) for _ in range(num_queries)]
+        results["actors_connecting_films"] = time_calls(
+            lambda film1, film2: bacon_number.actors_connecting_films(
+                transformed_data, film1, film2
+            ),
+            film_pairs,
+        )
+    return {name: summarize(times) for name, times in results.items()}
+
+
+def run_benchmark(name, num_queries=100, seed=0):
+    """
+    builds and queries one database, returns the json report as a dictionary
+    """
+    raw_data = load_database(name, seed)
+    transformed_data, build = benchmark_build(raw_data)
+    return {
+        "database": name,
+        "seed": seed,
+        "queries_per_function": num_queries,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "build": build,
+        "queries": benchmark_queries(raw_data, transformed_data, num_queries, seed),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "databases",
+        nargs="*",
+        default=["tiny", "small", "large"],
+        help="tiny, small, large, a pickle path or synthetic:NUM_ACTORS",
+    )
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the json reports to this file")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for name in args.databases:
+        report = run_benchmark(name, args.queries, args.seed)
+        reports.append(report)
+        print(f"{name}: built in {report['build']['seconds']:.3f}s", file=sys.stderr)
+        for query, result in report["queries"].items():
+            print(
+                f"    {query}: p50 {result['p50_ms']:.3f}ms "
+                f"p99 {result['p99_ms']:.3f}ms",
+                file=sys.stderr,
+            )
+    output = json.dumps(reports, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
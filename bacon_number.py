@@ -3,7 +3,20 @@ finding the Kevin Bacon number of different actors in a database
 utilizes a flood fill searching technique to find connecting paths between actors
 """
 
+import os
+import sys
+import mmap
+import time
+import array
+import bisect
+import functools
+import heapq
 import pickle
+import struct
+import threading
+import multiprocessing
+import multiprocessing.pool
+from collections.abc import Mapping
 
 
 def transform_data(raw_data):
@@ -180,32 +193,128 @@ def movie_path(raw_data, actor_id_1, actor_id_2):
     return movie_names
 
 
+def flood_fill_parents(transformed_data, sources, targets=None):
+    """
+    flood fills outward from every actor in sources at the same time
+    returns a dictionary mapping each reached actor to the actor it was reached
+    from (sources map to None). stops early once every actor in targets has
+    been reached
+    """
+    parents = {source: None for source in sources}
+    remaining = None
+    if targets is not None:
+        remaining = set(targets).difference(parents)
+        if not remaining:
+            return parents
+    agenda = list(parents)
+    while agenda:
+        new_agenda = []
+        for actor1 in agenda:  # expands one layer at a time
+            if actor1 not in transformed_data:
+                continue
+            for actor2 in transformed_data[actor1][0]:
+                if actor2 not in parents:
+                    parents[actor2] = actor1
+                    new_agenda.append(actor2)
+                    if remaining is not None:
+                        remaining.discard(actor2)
+                        if not remaining:  # every target has been found
+                            return parents
+        agenda = new_agenda
+    return parents
+
+
+def trace_path(parents, actor):
+    """
+    follows the parent pointers from actor back to a source
+    returns list of actors from the source to actor, or None if never reached
+    """
+    if actor not in parents:
+        return None
+    path = [actor]
+    while parents[path[-1]] is not None:
+        path.append(parents[path[-1]])
+    path.reverse()
+    return path
+
+
+def actor_path_search(
+    transformed_data,
+    actor_id_1,
+    goal_test_function,
+    max_depth=None,
+    max_results=None,
+    time_limit=None,
+):
+    """
+    generator that yields a path to every actor that fulfills the function,
+    closest actors first. each actor is tested exactly once, in the order the
+    flood fill reaches them, so the caller can stop as soon as it has enough
+
+    actor_id_1 can also be a set of actors to start from at once
+    max_depth: only look at actors at most this many steps away
+    max_results: stop after yielding this many paths
+    time_limit: stop after this many seconds
+    """
+    if max_results is not None and max_results <= 0:
+        return
+    if time_limit is not None:
+        deadline = time.monotonic() + time_limit
+    if isinstance(actor_id_1, (set, frozenset)):
+        sources = actor_id_1
+    else:
+        sources = {actor_id_1}
+    parents = {}
+    found = 0
+    agenda = []
+    for actor in sources:
+        parents[actor] = None
+        agenda.append(actor)
+        if goal_test_function(actor):  # tests if a start fulfills function
+            yield [actor]
+            found += 1
+            if found == max_results:
+                return
+    depth = 0
+    while agenda and (max_depth is None or depth < max_depth):  # flood fill
+        depth += 1
+        new_agenda = []
+        for actor1 in agenda:
+            if time_limit is not None and time.monotonic() > deadline:
+                return
+            for actor2 in transformed_data[actor1][0]:
+                if actor2 not in parents:  # checks if actor has been visited
+                    parents[actor2] = actor1
+                    new_agenda.append(actor2)
+                    if goal_test_function(actor2):  # tests if actor2 fulfills
+                        yield trace_path(parents, actor2)
+                        found += 1
+                        if found == max_results:
+                            return
+        agenda = new_agenda
+
+
 def actor_path(transformed_data, actor_id_1, goal_test_function):
     """
     connects an actor to a list of other actors (in the form of a function)
+    actor_id_1 can also be a set of actors, in which case the path starts from
+    whichever of them is closest to an actor that fulfills the function
     """
-    visited = {actor_id_1}
-    possible_paths = [[actor_id_1]]  # flood fill
-    new_possible_paths = []
-    n = 1
-    while n > 0:
-        for path in possible_paths:  # iterates through each path
-            actor1 = path[-1]
-            for actor2 in transformed_data[actor1][0]:
-                if goal_test_function(actor1):  # tests if actor1 fulfills function
-                    return path
-                if goal_test_function(actor2):  # tests if actor2 fulfills function
-                    path.append(actor2)
-                    return path
-                if actor2 not in visited:  # checks if actor has been visited
-                    new_path = path.copy()
-                    new_path.append(actor2)
-                    new_possible_paths.append(new_path)
-                    visited.add(actor2)
-                if len(visited) == len(transformed_data):  # checks if no path exists
-                    return None
-        possible_paths = new_possible_paths.copy()
-        new_possible_paths.clear()
+    return next(
+        actor_path_search(transformed_data, actor_id_1, goal_test_function), None
+    )
+
+
+def nearest_actors(transformed_data, actor_id, goal_test_function, n, **limits):
+    """
+    returns list of paths to the n closest actors that fulfill the function
+    accepts the same max_depth and time_limit limits as actor_path_search
+    """
+    return list(
+        actor_path_search(
+            transformed_data, actor_id, goal_test_function, max_results=n, **limits
+        )
+    )
 
 
 def actors_connecting_films(transformed_data, film1, film2):
@@ -213,7 +322,6 @@ def actors_connecting_films(transformed_data, film1, film2):
     finds shortest path from one movie to another using the actors in the movies
     returns a list actors from the starting movie to the end movie
     """
-    possible_paths = set()
     film1_actors = set()
     film2_actors = set()
     for actor in transformed_data:  # iterates through every actor
@@ -221,33 +329,661 @@ def actors_connecting_films(transformed_data, film1, film2):
             film1_actors.add(actor)
         if film2 in transformed_data[actor][1]:  # checks if actor in film2
             film2_actors.add(actor)
-    for actor in film1_actors:  # iterates through each actor in film1
-        path = actor_path(
-            transformed_data, actor, lambda x: x in film2_actors
-        )  # finds shortest path between actor and film2
-        possible_paths.add(tuple(path))
-    min_len = 10**10
-    for path in possible_paths:  # finds the shortest of the possible path
-        if len(path) < min_len:
-            min_len = len(path)
-    for path in possible_paths:
-        if len(path) == min_len:
-            return list(path)
+    return actor_path(
+        transformed_data, film1_actors, lambda x: x in film2_actors
+    )  # one flood fill from every actor in film1 at once
+
+
+_worker_data = None
+
+
+def _init_worker(transformed_data):
+    """
+    stores the graph in a worker process so tasks don't have to send it again
+    """
+    global _worker_data
+    _worker_data = transformed_data
+
+
+def worker_data():
+    """
+    returns the graph stored in this worker process by make_pool
+    """
+    return _worker_data
+
+
+def make_pool(transformed_data, processes=None, threads=False):
+    """
+    returns a process pool whose workers can all read transformed_data through
+    worker_data(). workers are forked where possible so they share the
+    parent's copy of the graph instead of each receiving their own
+
+    if threads is True a pool of threads is returned instead, which is cheaper
+    to start when the work is small. threads share the process (and with it
+    worker_data()) with every other pool, so their tasks should be given the
+    graph directly, like functools.partial(paths_from_source_in, graph)
+    """
+    if threads:
+        return multiprocessing.pool.ThreadPool(processes)
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    return context.Pool(
+        processes, initializer=_init_worker, initargs=(transformed_data,)
+    )
+
+
+def paths_from_source_in(transformed_data, task):
+    """
+    input: (source, targets) pair
+    runs one flood fill from source and finds a path to every target
+    returns (source, dictionary mapping each target to its path or None)
+    """
+    source, targets = task
+    parents = flood_fill_parents(transformed_data, {source}, targets)
+    return source, {target: trace_path(parents, target) for target in targets}
+
+
+def paths_from_source(task):
+    """
+    same as paths_from_source_in on the graph of a make_pool worker process
+    """
+    return paths_from_source_in(_worker_data, task)
+
+
+def group_by_source(queries):
+    """
+    input: list of (source, target) pairs
+    returns a dictionary mapping each source to the set of its targets
+    """
+    groups = {}
+    for source, target in queries:
+        if source not in groups:
+            groups[source] = set()
+        groups[source].add(target)
+    return groups
+
+
+def batch_paths(transformed_data, queries, processes=1):
+    """
+    input: list of (source, target) actor pairs
+    finds the shortest path for every pair. pairs that share a source are all
+    answered from a single flood fill of that source
+
+    if processes is more than 1 (or None, for one per cpu) the sources are
+    spread across a process pool (see make_pool)
+    returns list of paths (None if no path exists) in the same order as queries
+    """
+    queries = list(queries)
+    tasks = list(group_by_source(queries).items())
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(tasks))
+    if processes <= 1:
+        find_paths = functools.partial(paths_from_source_in, transformed_data)
+        results = dict(map(find_paths, tasks))
+    else:
+        with make_pool(transformed_data, processes) as pool:
+            chunksize = max(1, len(tasks) // (processes * 4))
+            results = dict(pool.imap_unordered(paths_from_source, tasks, chunksize))
+    return [results[source][target] for source, target in queries]
+
+
+def batch_distances(transformed_data, queries, processes=1):
+    """
+    same as batch_paths but returns the number of steps between each pair
+    (None if no path exists)
+    """
+    return [
+        None if path is None else len(path) - 1
+        for path in batch_paths(transformed_data, queries, processes)
+    ]
+
+
+class ActorGraph(Mapping):
+    """
+    actor graph that new credits can be added to (or removed from) without
+    rebuilding everything with transform_data
+
+    behaves like the dictionary returned by transform_data (graph[actor] gives
+    [set of co-stars, set of films], isolated pairs of actors are left out) so
+    every query function works on it. it also keeps the bacon number of every
+    actor up to date, only recomputing the ones an update can change
+    """
+
+    def __init__(self, raw_data=(), source=4724):
+        self.source = source
+        self._data = {}  # what queries see, same layout as transform_data
+        self._costars = {}  # actor -> {co-star: number of credits together}
+        self._films = {}  # actor -> {film: number of credits}
+        self._distances = {}  # actor -> bacon number
+        self._levels = {}  # bacon number -> set of actors
+        self._lock = threading.RLock()
+        self.add_credits(raw_data)
+
+    def __getitem__(self, actor):
+        return self._data[actor]
+
+    def __contains__(self, actor):
+        return actor in self._data
+
+    def __iter__(self):
+        return iter(list(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+    def bacon_number(self, actor):
+        """
+        returns the bacon number of actor, or None if they are not connected
+        """
+        return self._distances.get(actor)
+
+    def actors_with_bacon_number(self, n):
+        """
+        returns a set of all of the actors with the given bacon number n
+        """
+        return set(self._levels.get(n, ()))
+
+    def add_credits(self, raw_data):
+        """
+        adds a list of (actor1, actor2, film) credits to the graph
+        """
+        self._update(raw_data, 1)
+
+    def remove_credits(self, raw_data):
+        """
+        removes a list of previously added (actor1, actor2, film) credits
+        raises a KeyError (and changes nothing) if a credit was never added
+        """
+        raw_data = list(raw_data)
+        films_needed = {}
+        costars_needed = {}
+        for actor1, actor2, film in raw_data:
+            for actor in (actor1, actor2):
+                key = (actor, film)
+                films_needed[key] = films_needed.get(key, 0) + 1
+            if actor1 != actor2:
+                for key in ((actor1, actor2), (actor2, actor1)):
+                    costars_needed[key] = costars_needed.get(key, 0) + 1
+        with self._lock:  # every count _update lowers must stay positive
+            for (actor, film), count in films_needed.items():
+                if self._films.get(actor, {}).get(film, 0) < count:
+                    raise KeyError((actor, film))
+            for (actor, costar), count in costars_needed.items():
+                if self._costars.get(actor, {}).get(costar, 0) < count:
+                    raise KeyError((actor, costar))
+            self._update(raw_data, -1)
+
+    def _count(self, counts, actor, item, change):
+        """
+        adds change to counts[actor][item], dropping entries that reach zero
+        returns True if item was added to or removed from counts[actor]
+        """
+        inner = counts.setdefault(actor, {})
+        new_count = inner.get(item, 0) + change
+        if new_count:
+            inner[item] = new_count
+            return new_count == change
+        del inner[item]
+        if not inner:
+            del counts[actor]
+        return True
+
+    def _visible(self, actor):
+        """
+        checks if actor should be in the graph: they need at least one co-star
+        and must not be one of a pair who have only acted with each other
+        """
+        costars = self._costars.get(actor)
+        if not costars:
+            return False
+        if len(costars) == 1:
+            for costar in costars:
+                if len(self._costars[costar]) == 1:
+                    return False
+        return True
+
+    def _update(self, raw_data, change):
+        with self._lock:
+            changed = set()  # actors whose co-stars or films changed
+            pairs = set()  # pairs of actors who gained or lost their last film
+            degrees = {}  # number of co-stars before the update
+            for actor1, actor2, film in raw_data:
+                for actor in (actor1, actor2):
+                    if self._count(self._films, actor, film, change):
+                        changed.add(actor)
+                if actor1 == actor2:
+                    continue
+                new_pair = self._count(self._costars, actor1, actor2, change)
+                self._count(self._costars, actor2, actor1, change)
+                if new_pair:  # or a pair that is gone
+                    pairs.add((actor1, actor2))
+                    for actor in (actor1, actor2):
+                        changed.add(actor)
+                        if actor not in degrees:  # the first change to it
+                            degree = len(self._costars.get(actor, ())) - change
+                            degrees[actor] = degree
+
+            candidates = set(changed)
+            for actor, degree in degrees.items():
+                # an actor left with (or losing) a single co-star can make
+                # that co-star one of an isolated pair (or stop it being one)
+                if degree == 1 or len(self._costars.get(actor, ())) == 1:
+                    candidates.update(self._costars.get(actor, ()))
+
+            # the only edges that can appear or disappear: the changed pairs
+            # and every edge of an actor who appears or disappears
+            data = self._data
+            edges = set(pairs)
+            visible = {actor: self._visible(actor) for actor in candidates}
+            flipped = set()
+            for actor, shown in visible.items():
+                if shown != (actor in data):
+                    old = data[actor][0] if actor in data else ()
+                    for costar in {*old, *self._costars.get(actor, ())}:
+                        if costar not in flipped:
+                            edges.add((actor, costar))
+                    flipped.add(actor)
+            old_edges = {(a, b) for a, b in edges if a in data and b in data[a][0]}
+
+            for actor, shown in visible.items():  # replaces, never mutates
+                if not shown:
+                    data.pop(actor, None)
+                elif actor in changed or actor not in data:
+                    data[actor] = [
+                        set(self._costars[actor]),
+                        set(self._films[actor]),
+                    ]
+            new_edges = {(a, b) for a, b in edges if a in data and b in data[a][0]}
+            self._update_distances(old_edges - new_edges, new_edges - old_edges)
+
+    def _set_distance(self, actor, distance):
+        old = self._distances.get(actor)
+        if old is not None:
+            self._levels[old].discard(actor)
+            if not self._levels[old]:
+                del self._levels[old]
+        if distance is None:
+            self._distances.pop(actor, None)
+        else:
+            self._distances[actor] = distance
+            self._levels.setdefault(distance, set()).add(actor)
+
+    def _update_distances(self, removed_edges, added_edges):
+        """
+        fixes the bacon numbers after edges were removed and added
+        """
+        distances = self._distances
+        if self.source not in self._data:
+            for actor in list(distances):
+                self._set_distance(actor, None)
+            return
+
+        # actors whose every shortest path to the source used a removed edge,
+        # found in increasing order of bacon number
+        agenda = []
+        for edge in removed_edges:
+            for actor in edge:
+                if actor in distances:
+                    heapq.heappush(agenda, (distances[actor], actor))
+        lost = set()
+        while agenda:
+            distance, actor = heapq.heappop(agenda)
+            if actor in lost or actor == self.source:
+                continue
+            supported = actor in self._data and any(
+                distances.get(costar) == distance - 1 and costar not in lost
+                for costar in self._data[actor][0]
+            )
+            if supported:
+                continue
+            lost.add(actor)
+            if actor not in self._data:  # left the graph entirely
+                continue
+            for costar in self._data[actor][0]:
+                if distances.get(costar) == distance + 1:
+                    heapq.heappush(agenda, (distance + 1, costar))
+        for actor in lost:
+            self._set_distance(actor, None)
+
+        # everything that can get a smaller number: the lost actors and both
+        # ends of every new edge, then flood outwards from the improvements
+        candidates = set(lost)
+        for edge in added_edges:
+            candidates.update(edge)
+        candidates.add(self.source)
+        agenda = []
+        for actor in candidates:
+            if actor not in self._data:
+                continue
+            if actor == self.source:
+                best = 0
+            else:
+                best = min(
+                    (distances[costar] + 1 for costar in self._data[actor][0]
+                     if costar in distances),
+                    default=None,
+                )
+            if best is not None and best < distances.get(actor, float("inf")):
+                self._set_distance(actor, best)
+                heapq.heappush(agenda, (best, actor))
+        while agenda:
+            distance, actor = heapq.heappop(agenda)
+            if distances.get(actor) != distance:
+                continue
+            for costar in self._data[actor][0]:
+                if distance + 1 < distances.get(costar, float("inf")):
+                    self._set_distance(costar, distance + 1)
+                    heapq.heappush(agenda, (distance + 1, costar))
+
+
+GRAPH_MAGIC = b"BACONGR1"
+GRAPH_HEADER = struct.Struct("<8s8q")
+# header: magic, byteorder flag, number of actors, number of adjacency entries,
+# number of film entries, number of actor names, bytes of actor names,
+# number of movie names, bytes of movie names
+
+
+def _write_array(file, typecode, values):
+    """
+    writes values as a packed array and pads the file to 8 byte alignment
+    """
+    packed = array.array(typecode, values)
+    packed.tofile(file)
+    padding = -file.tell() % 8
+    file.write(b"\0" * padding)
+
+
+def _write_name_table(file, names):
+    """
+    writes a name table: ids sorted, name offsets, a permutation of the ids
+    sorted by name, then every utf-8 encoded name back to back
+    """
+    ids = sorted(names)
+    encoded = [names[name_id].encode("utf-8") for name_id in ids]
+    offsets = [0]
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    by_name = sorted(range(len(ids)), key=lambda index: encoded[index])
+    _write_array(file, "q", ids)
+    _write_array(file, "q", offsets)
+    _write_array(file, "q", by_name)
+    file.write(b"".join(encoded))
+    file.write(b"\0" * (-file.tell() % 8))
+    return len(ids), offsets[-1]
+
+
+def compile_graph(transformed_data, filename, names=None, movies=None):
+    """
+    writes transformed data (as returned by transform_data) to a compiled graph
+    file that can be opened with CompiledGraph
+
+    names and movies are optional dictionaries in the same form as the
+    names.pickle and movies.pickle databases (name -> id)
+    """
+    actor_ids = sorted(transformed_data)
+    index = {actor: i for i, actor in enumerate(actor_ids)}
+    adjacency_offsets = [0]
+    adjacency = []
+    film_offsets = [0]
+    films = []
+    for actor in actor_ids:  # csr layout, one slice of each array per actor
+        costars, actor_films = transformed_data[actor][0], transformed_data[actor][1]
+        adjacency.extend(sorted(index[costar] for costar in costars if costar in index))
+        adjacency_offsets.append(len(adjacency))
+        films.extend(sorted(actor_films))
+        film_offsets.append(len(films))
+
+    actor_names = {} if names is None else {v: k for k, v in names.items()}
+    movie_names = {} if movies is None else {v: k for k, v in movies.items()}
+    with open(filename, "wb") as file:
+        file.write(b"\0" * GRAPH_HEADER.size)
+        _write_array(file, "q", actor_ids)
+        _write_array(file, "q", adjacency_offsets)
+        _write_array(file, "i", adjacency)
+        _write_array(file, "q", film_offsets)
+        _write_array(file, "q", films)
+        num_names, name_bytes = _write_name_table(file, actor_names)
+        num_movies, movie_bytes = _write_name_table(file, movie_names)
+        file.seek(0)
+        file.write(
+            GRAPH_HEADER.pack(
+                GRAPH_MAGIC,
+                sys.byteorder == "little",
+                len(actor_ids),
+                len(adjacency),
+                len(films),
+                num_names,
+                name_bytes,
+                num_movies,
+                movie_bytes,
+            )
+        )
+
+
+def convert_pickles(data_filename, filename, names_filename=None, movies_filename=None):
+    """
+    converts the existing raw data pickle (and optionally the names and movies
+    pickles) into a single compiled graph file
+    """
+    with open(data_filename, "rb") as f:
+        raw_data = pickle.load(f)
+    names = movies = None
+    if names_filename is not None:
+        with open(names_filename, "rb") as f:
+            names = pickle.load(f)
+    if movies_filename is not None:
+        with open(movies_filename, "rb") as f:
+            movies = pickle.load(f)
+    compile_graph(transform_data(raw_data), filename, names, movies)
+
+
+def _has_tables(filename, names, movies):
+    """
+    checks that the compiled graph file has a name table if names is True and
+    a movie table if movies is True (a table is left out if it had no names)
+    """
+    with open(filename, "rb") as f:
+        header = f.read(GRAPH_HEADER.size)
+    if len(header) < GRAPH_HEADER.size or header[: len(GRAPH_MAGIC)] != GRAPH_MAGIC:
+        return False
+    header = GRAPH_HEADER.unpack(header)
+    return (header[5] or not names) and (header[7] or not movies)
+
+
+def open_graph(data_filename, names_filename=None, movies_filename=None):
+    """
+    opens the compiled graph file next to a raw data pickle (same name ending
+    in .graph), converting the pickles first if it doesn't exist yet, is
+    older than any of them or is missing a name or movie table asked for
+    """
+    filename = os.path.splitext(data_filename)[0] + ".graph"
+    sources = [
+        source
+        for source in (data_filename, names_filename, movies_filename)
+        if source is not None
+    ]
+    newest = max(os.path.getmtime(source) for source in sources)
+    if (
+        not os.path.exists(filename)
+        or os.path.getmtime(filename) < newest
+        or not _has_tables(
+            filename, names_filename is not None, movies_filename is not None
+        )
+    ):
+        partial = filename + ".tmp"  # never leaves a half written graph behind
+        convert_pickles(data_filename, partial, names_filename, movies_filename)
+        os.replace(partial, filename)
+    return CompiledGraph(filename)
+
+
+class _NameTable:
+    """
+    id <-> name lookups over one memory mapped name table
+    """
+
+    def __init__(self, ids, offsets, by_name, blob):
+        self.ids = ids
+        self.offsets = offsets
+        self.by_name = by_name
+        self.blob = blob
+
+    def _name(self, index):
+        return bytes(self.blob[self.offsets[index] : self.offsets[index + 1]])
+
+    def name(self, name_id):
+        """
+        returns the name stored for name_id, raises KeyError if there is none
+        """
+        index = bisect.bisect_left(self.ids, name_id)
+        if index == len(self.ids) or self.ids[index] != name_id:
+            raise KeyError(name_id)
+        return self._name(index).decode("utf-8")
+
+    def id(self, name):
+        """
+        returns the id stored for name, raises KeyError if there is none
+        """
+        encoded = name.encode("utf-8")
+        low, high = 0, len(self.by_name)
+        while low < high:  # binary search over the names in sorted order
+            middle = (low + high) // 2
+            if self._name(self.by_name[middle]) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(self.by_name) or self._name(self.by_name[low]) != encoded:
+            raise KeyError(name)
+        return self.ids[self.by_name[low]]
+
+
+class CompiledGraph(Mapping):
+    """
+    read only view of a compiled graph file
+
+    behaves like the dictionary returned by transform_data (graph[actor] gives
+    [set of co-stars, set of films]) so every query function works on it, but
+    the arrays are memory mapped: opening is instant, pages are only read when
+    they are used, and processes that open the same file share them
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if (
+            len(self._mmap) < GRAPH_HEADER.size
+            or self._mmap[: len(GRAPH_MAGIC)] != GRAPH_MAGIC
+        ):
+            self._mmap.close()
+            raise ValueError(f"{filename} is not a compiled graph file")
+        header = GRAPH_HEADER.unpack_from(self._mmap)
+        if header[1] != (sys.byteorder == "little"):
+            self._mmap.close()
+            raise ValueError(f"{filename} was compiled with a different byteorder")
+        num_actors, num_adjacency, num_films = header[2:5]
+        view = memoryview(self._mmap)
+        self._views = [view]
+        position = GRAPH_HEADER.size
+
+        def take(typecode, count):
+            nonlocal position
+            size = array.array(typecode).itemsize * count
+            part = view[position : position + size].cast(typecode)
+            self._views.append(part)
+            position += size + (-size % 8)
+            return part
+
+        def take_names(count, num_bytes):
+            nonlocal position
+            ids = take("q", count)
+            offsets = take("q", count + 1)
+            by_name = take("q", count)
+            blob = view[position : position + num_bytes]
+            self._views.append(blob)
+            position += num_bytes + (-num_bytes % 8)
+            return _NameTable(ids, offsets, by_name, blob)
+
+        self.actor_ids = take("q", num_actors)
+        self.adjacency_offsets = take("q", num_actors + 1)
+        self.adjacency = take("i", num_adjacency)
+        self.film_offsets = take("q", num_actors + 1)
+        self.films = take("q", num_films)
+        self.names = take_names(header[5], header[6])
+        self.movies = take_names(header[7], header[8])
+
+    def index(self, actor):
+        """
+        returns the position of actor in the actor array, or None if missing
+        """
+        index = bisect.bisect_left(self.actor_ids, actor)
+        if index < len(self.actor_ids) and self.actor_ids[index] == actor:
+            return index
+        return None
+
+    def costars(self, actor):
+        """
+        returns list of every actor the given actor has acted with
+        """
+        index = self.index(actor)
+        if index is None:
+            raise KeyError(actor)
+        start, end = self.adjacency_offsets[index], self.adjacency_offsets[index + 1]
+        return [self.actor_ids[i] for i in self.adjacency[start:end]]
+
+    def actor_films(self, actor):
+        """
+        returns list of every film the given actor has been in
+        """
+        index = self.index(actor)
+        if index is None:
+            raise KeyError(actor)
+        start, end = self.film_offsets[index], self.film_offsets[index + 1]
+        return self.films[start:end].tolist()
+
+    def __getitem__(self, actor):
+        return [set(self.costars(actor)), set(self.actor_films(actor))]
+
+    def __contains__(self, actor):
+        return self.index(actor) is not None
+
+    def __iter__(self):
+        return iter(self.actor_ids.tolist())
+
+    def __len__(self):
+        return len(self.actor_ids)
+
+    def __reduce__(self):
+        # other processes reopen the file rather than copying the arrays
+        return (CompiledGraph, (self.filename,))
+
+    def close(self):
+        """
+        releases the memory map
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
 
 if __name__ == "__main__":
-    with open("resources/small.pickle", "rb") as f:
-        smalldb = pickle.load(f)
-    with open("resources/names.pickle", "rb") as f:
-        namesdb = pickle.load(f)
-    with open("resources/tiny.pickle", "rb") as f:
-        tinydb = pickle.load(f)
-    with open("resources/movies.pickle", "rb") as f:
-        moviesdb = pickle.load(f)
-    with open("resources/small_names.pickle", "rb") as f:
-        small_namesdb = pickle.load(f)
-    with open("resources/large.pickle", "rb") as f:
-        largedb = pickle.load(f)
+    # the pickles are only read the first time, later runs open the compiled
+    # .graph files. names and movies are looked up with db.names.name(id),
+    # db.names.id(name), db.movies.name(id) and db.movies.id(name)
+    tinydb = open_graph("resources/tiny.pickle")
+    smalldb = open_graph("resources/small.pickle", "resources/small_names.pickle")
+    largedb = open_graph(
+        "resources/large.pickle", "resources/names.pickle", "resources/movies.pickle"
+    )
     # additional code here will be run only when lab.py is invoked directly
     # (not when imported from test.py), so this is a good place to put code
     # used, for example, to generate the results for the online questions.
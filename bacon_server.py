@@ -0,0 +1,378 @@
+"""
+long running http/json server that answers actor graph queries
+loads the graph once, keeps connections alive, batches concurrent path
+queries by source, caches recent answers and runs the flood fills in a pool
+"""
+
+import json
+import pickle
+import asyncio
+import functools
+import argparse
+import http.client
+import urllib.parse
+from collections import OrderedDict
+
+import bacon_number
+
+
+class LRUCache:
+    """
+    dictionary that only keeps the maxsize most recently used entries
+    """
+
+    def __init__(self, maxsize=10_000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return default
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __setitem__(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)  # evicts least recently used
+
+
+def _connecting_films(film1, film2):  # in a worker process
+    return bacon_number.actors_connecting_films(
+        bacon_number.worker_data(), film1, film2
+    )
+
+
+class QueryBatcher:
+    """
+    collects path queries that arrive close together and answers them as one
+    batch, so queries that share a source only need one flood fill
+    """
+
+    def __init__(self, run_batch, max_batch=256, max_delay=0.002):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = []
+        self._timer = None
+        self._running = set()
+
+    async def submit(self, source, target):
+        """
+        waits for the batch containing this query and returns its path
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((source, target, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_delay, self._flush
+            )
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.ensure_future(self._run(pending))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, pending):
+        groups = bacon_number.group_by_source(
+            (source, target) for source, target, _ in pending
+        )
+        try:
+            results = await self.run_batch(list(groups.items()))
+        except Exception as error:  # every waiting query gets the error
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for source, target, future in pending:
+            if not future.done():
+                future.set_result(results[source][target])
+
+
+class BaconServer:
+    """
+    http server over one loaded graph
+
+    endpoints (all answers are json):
+        GET  /health
+        GET  /path?source=ACTOR&target=ACTOR
+        GET  /distance?source=ACTOR&target=ACTOR
+        GET  /connecting_films?film1=FILM&film2=FILM
+        POST /batch  {"queries": [{"type": "path", "source": .., "target": ..},
+                                  {"type": "connecting_films", "film1": ..,
+                                   "film2": ..}, ...]}
+    """
+
+    def __init__(
+        self, transformed_data, processes=None, threads=False, cache_size=10_000
+    ):
+        self.transformed_data = transformed_data
+        self.pool = bacon_number.make_pool(transformed_data, processes, threads)
+        if threads:  # threads are handed this server's graph with every task
+            self._paths_task = functools.partial(
+                bacon_number.paths_from_source_in, transformed_data
+            )
+            self._films_task = functools.partial(
+                bacon_number.actors_connecting_films, transformed_data
+            )
+        else:
+            self._paths_task = bacon_number.paths_from_source
+            self._films_task = _connecting_films
+        self.cache = LRUCache(cache_size)
+        self.batcher = QueryBatcher(self._run_batch)
+        self.server = None
+
+    def _in_pool(self, function, args):
+        """
+        runs function in the pool, returns a future for its result
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle(result, error=None):  # the waiting request may be gone
+            if future.done():
+                return
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+        def done(result):
+            loop.call_soon_threadsafe(settle, result)
+
+        def failed(error):
+            loop.call_soon_threadsafe(settle, None, error)
+
+        self.pool.apply_async(function, args, callback=done, error_callback=failed)
+        return future
+
+    async def _run_batch(self, tasks):
+        results = await asyncio.gather(
+            *(self._in_pool(self._paths_task, (task,)) for task in tasks)
+        )
+        return dict(results)
+
+    async def path(self, source, target):
+        """
+        returns the shortest list of actors from source to target (or None)
+        """
+        key = ("path", source, target)
+        if key in self.cache:
+            return self.cache.get(key)
+        path = await self.batcher.submit(source, target)
+        self.cache[key] = path
+        return path
+
+    async def distance(self, source, target):
+        path = await self.path(source, target)
+        return None if path is None else len(path) - 1
+
+    async def connecting_films(self, film1, film2):
+        key = ("connecting_films", film1, film2)
+        if key in self.cache:
+            return self.cache.get(key)
+        path = await self._in_pool(self._films_task, (film1, film2))
+        self.cache[key] = path
+        return path
+
+    async def answer(self, query):
+        """
+        answers one query dictionary, returns its json result
+        """
+        kind = query.get("type")
+        if kind == "path":
+            path = await self.path(int(query["source"]), int(query["target"]))
+            return {"path": path}
+        if kind == "distance":
+            distance = await self.distance(int(query["source"]), int(query["target"]))
+            return {"distance": distance}
+        if kind == "connecting_films":
+            path = await self.connecting_films(
+                int(query["film1"]), int(query["film2"])
+            )
+            return {"path": path}
+        raise ValueError(f"unknown query type {kind!r}")
+
+    async def dispatch(self, method, target, body):
+        """
+        returns (status, json result) for one http request
+        """
+        url = urllib.parse.urlsplit(target)
+        params = {
+            key: values[-1]
+            for key, values in urllib.parse.parse_qs(url.query).items()
+        }
+        endpoint = url.path.strip("/")
+        try:
+            if endpoint == "health":
+                return 200, {"actors": len(self.transformed_data)}
+            if endpoint == "batch":
+                if method != "POST":
+                    return 405, {"error": "batch needs POST"}
+                queries = json.loads(body)["queries"]
+                results = await asyncio.gather(
+                    *(self.answer(query) for query in queries)
+                )
+                return 200, {"results": list(results)}
+            if endpoint in ("path", "distance", "connecting_films"):
+                if method == "POST" and body:
+                    params = json.loads(body)
+                return 200, await self.answer(dict(params, type=endpoint))
+        except (KeyError, ValueError, TypeError) as error:
+            return 400, {"error": f"bad request: {error!r}"}
+        return 404, {"error": f"no endpoint {url.path}"}
+
+    async def handle_connection(self, reader, writer):
+        """
+        answers requests on one connection until the client closes it
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip().lower()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                try:
+                    status, result = await self.dispatch(method, target, body)
+                except Exception as error:  # answers rather than dropping the line
+                    status, result = 500, {"error": f"internal error: {error!r}"}
+
+                connection = headers.get("connection", "")
+                keep_alive = connection != "close" and (
+                    version == "HTTP/1.1" or connection == "keep-alive"
+                )
+                payload = json.dumps(result).encode("utf-8")
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {http.client.responses[status]}\r\n"
+                        f"Content-Type: application/json\r\n"
+                        f"Content-Length: {len(payload)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                        "\r\n"
+                    ).encode("latin-1")
+                    + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8009):
+        """
+        starts listening, returns the port (useful when port is 0)
+        """
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.pool.terminate()
+
+
+class BaconClient:
+    """
+    client for BaconServer that reuses one connection for every request
+    """
+
+    def __init__(self, host="127.0.0.1", port=8009, timeout=60):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, method, path, body=None):
+        if body is None:
+            self.connection.request(method, path)
+        else:
+            self.connection.request(
+                method,
+                path,
+                json.dumps(body),
+                {"Content-Type": "application/json"},
+            )
+        response = self.connection.getresponse()
+        result = json.loads(response.read())
+        if response.status != 200:
+            raise ValueError(result.get("error"))
+        return result
+
+    def path(self, source, target):
+        query = urllib.parse.urlencode({"source": source, "target": target})
+        return self._request("GET", f"/path?{query}")["path"]
+
+    def distance(self, source, target):
+        query = urllib.parse.urlencode({"source": source, "target": target})
+        return self._request("GET", f"/distance?{query}")["distance"]
+
+    def connecting_films(self, film1, film2):
+        query = urllib.parse.urlencode({"film1": film1, "film2": film2})
+        return self._request("GET", f"/connecting_films?{query}")["path"]
+
+    def batch(self, queries):
+        """
+        sends a list of query dictionaries at once, returns list of results
+        """
+        return self._request("POST", "/batch", {"queries": queries})["results"]
+
+    def close(self):
+        self.connection.close()
+
+
+def load_graph(filename):
+    """
+    opens a compiled graph file, or builds the graph from a raw data pickle
+    """
+    with open(filename, "rb") as f:
+        if f.read(len(bacon_number.GRAPH_MAGIC)) == bacon_number.GRAPH_MAGIC:
+            return bacon_number.CompiledGraph(filename)
+        f.seek(0)
+        return bacon_number.transform_data(pickle.load(f))
+
+
+async def serve(filename, host, port, processes, cache_size):
+    server = BaconServer(load_graph(filename), processes, cache_size=cache_size)
+    port = await server.start(host, port)
+    print(f"serving {filename} on http://{host}:{port}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("database", help="raw data pickle or compiled graph file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8009)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--cache-size", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(
+        serve(args.database, args.host, args.port, args.processes, args.cache_size)
+    )
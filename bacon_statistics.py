@@ -0,0 +1,194 @@
+"""
+statistics about the actor graph built by bacon_number.transform_data
+degree distributions, connected components, eccentricities and sampled
+distributions of the distance between actors
+"""
+
+import os
+import random
+
+import bacon_number
+
+
+class UnionFind:
+    """
+    keeps track of which actors are connected to each other
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, item):
+        """
+        returns the representative of the group containing item
+        """
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            return item
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:  # path compression
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, item1, item2):
+        """
+        merges the groups containing item1 and item2
+        returns the representative of the merged group
+        """
+        root1, root2 = self.find(item1), self.find(item2)
+        if root1 == root2:
+            return root1
+        if self.size[root1] < self.size[root2]:  # union by size
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size.pop(root2)
+        return root1
+
+
+def connected_components(transformed_data):
+    """
+    returns a UnionFind grouping every actor with everyone they are connected
+    to through any chain of co-stars
+    """
+    groups = UnionFind()
+    for actor1 in transformed_data:
+        groups.find(actor1)
+        for actor2 in transformed_data[actor1][0]:
+            if actor2 in transformed_data:
+                groups.union(actor1, actor2)
+    return groups
+
+
+def component_sizes(transformed_data):
+    """
+    returns list of the sizes of every connected component, largest first
+    """
+    return sorted(connected_components(transformed_data).size.values(), reverse=True)
+
+
+def degree_histogram(transformed_data):
+    """
+    returns a dictionary mapping each number of co-stars to the number of actors
+    that have that many co-stars
+    """
+    histogram = {}
+    for actor in transformed_data:
+        degree = len(transformed_data[actor][0])
+        histogram[degree] = histogram.get(degree, 0) + 1
+    return dict(sorted(histogram.items()))
+
+
+def distance_histogram(transformed_data, actor):
+    """
+    flood fills from actor and returns a dictionary mapping each distance to
+    the number of other actors at that distance
+    """
+    histogram = {}
+    visited = {actor}
+    agenda = [actor]
+    distance = 0
+    while agenda:
+        distance += 1
+        new_agenda = []
+        for actor1 in agenda:
+            for actor2 in transformed_data[actor1][0]:
+                if actor2 not in visited:
+                    visited.add(actor2)
+                    new_agenda.append(actor2)
+        if new_agenda:
+            histogram[distance] = len(new_agenda)
+        agenda = new_agenda
+    return histogram
+
+
+def eccentricity(transformed_data, actor):
+    """
+    returns the distance from actor to the furthest actor connected to them
+    """
+    return max(distance_histogram(transformed_data, actor), default=0)
+
+
+def _histogram_from_worker(actor):
+    return actor, distance_histogram(bacon_number.worker_data(), actor)
+
+
+def merge_histograms(histograms):
+    """
+    adds together a list of distance histograms
+    """
+    merged = {}
+    for histogram in histograms:
+        for distance, count in histogram.items():
+            merged[distance] = merged.get(distance, 0) + count
+    return dict(sorted(merged.items()))
+
+
+def average_distance(histogram):
+    """
+    returns the mean distance described by a distance histogram
+    """
+    pairs = sum(histogram.values())
+    if not pairs:
+        return None
+    return sum(distance * count for distance, count in histogram.items()) / pairs
+
+
+def sample_distances(transformed_data, num_samples, processes=1, seed=None):
+    """
+    estimates the distribution of distances between connected pairs of actors
+    by flood filling from num_samples randomly chosen actors
+
+    this is a generator: after every finished flood fill it yields a report
+    dictionary with the number of sources done so far, the merged histogram,
+    the average distance and the largest eccentricity seen, so callers can
+    stop as soon as the estimate is good enough
+    """
+    actors = list(transformed_data)
+    sources = random.Random(seed).sample(actors, min(num_samples, len(actors)))
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    histogram = {}
+    report = {"sources": 0, "average": None, "max_eccentricity": 0}
+
+    def add(source, source_histogram):
+        for distance, count in source_histogram.items():
+            histogram[distance] = histogram.get(distance, 0) + count
+        report["sources"] += 1
+        report["average"] = average_distance(histogram)
+        report["max_eccentricity"] = max(
+            report["max_eccentricity"], max(source_histogram, default=0)
+        )
+        return dict(report, histogram=dict(sorted(histogram.items())), source=source)
+
+    if processes <= 1:
+        for source in sources:
+            yield add(source, distance_histogram(transformed_data, source))
+        return
+    with bacon_number.make_pool(transformed_data, processes) as pool:
+        for source, source_histogram in pool.imap_unordered(
+            _histogram_from_worker, sources
+        ):
+            yield add(source, source_histogram)
+
+
+def graph_summary(transformed_data, num_samples=100, processes=1, seed=None):
+    """
+    returns a dictionary with the main statistics of the graph
+    """
+    sizes = component_sizes(transformed_data)
+    report = None
+    for report in sample_distances(transformed_data, num_samples, processes, seed):
+        pass
+    return {
+        "actors": len(transformed_data),
+        "components": len(sizes),
+        "largest_component": sizes[0] if sizes else 0,
+        "degree_histogram": degree_histogram(transformed_data),
+        "sampled_distances": None if report is None else report["histogram"],
+        "average_distance": None if report is None else report["average"],
+    }
@@ -5,6 +5,8 @@ utilizes recursion to design algorithms
 
 import typing
 import doctest
+from math import prod
+from array import array
 
 
 
@@ -13,6 +15,8 @@ def dump(game):
     Prints a human-readable version of a game (provided as a dictionary)
     """
     for key, val in sorted(game.items()):
+        if isinstance(val, FlatArray):
+            val = val.tolist()
         if isinstance(val, list) and val and isinstance(val[0], list):
             print(f"{key}:")
             for inner in val:
@@ -21,6 +25,226 @@ def dump(game):
             print(f"{key}:", val)
 
 
+# Flat storage
+
+
+def get_strides(dimensions):
+    """
+    gets how far apart neighboring values along each dimension are in a
+    row-major flat array
+    """
+    strides = [1] * len(dimensions)
+    for index in range(len(dimensions) - 2, -1, -1):
+        strides[index] = strides[index + 1] * dimensions[index + 1]
+    return tuple(strides)
+
+
+def nest(values, dimensions):
+    """
+    turns a row-major flat list of values into nested lists
+    """
+    if len(dimensions) == 1:
+        return list(values)
+    step = len(values) // dimensions[0]
+    return [
+        nest(values[index * step : (index + 1) * step], dimensions[1:])
+        for index in range(dimensions[0])
+    ]
+
+
+def flatten(nested, dimensions):
+    """
+    turns nested lists into a row-major flat list of values
+    """
+    if len(dimensions) == 1:
+        return list(nested)
+    return [value for inner in nested for value in flatten(inner, dimensions[1:])]
+
+
+def get_flat_neighbors(dimensions, strides, index):
+    """
+    gets the flat indices of all the neighbors of a flat index (including
+    itself), without going through coordinates
+    """
+    shifts = [0]
+    for size, stride in zip(dimensions, strides):
+        coordinate = index // stride % size
+        steps = [step * stride for step in (-1, 0, 1) if 0 <= coordinate + step < size]
+        shifts = [shift + step for shift in shifts for step in steps]
+    return [index + shift for shift in shifts]
+
+
+class FlatArray:
+    """
+    N-dimensional array stored flat in row-major order. coordinates turn into
+    a flat index in one step using the precomputed strides. indexing with a
+    single int gives a view of that row sharing the same storage, so nested
+    list style code like array[0][1] keeps working
+    """
+
+    __slots__ = ("dimensions", "strides", "data", "offset")
+
+    def __init__(self, dimensions, data, offset=0):
+        self.dimensions = tuple(dimensions)
+        self.strides = get_strides(self.dimensions)
+        self.data = data
+        self.offset = offset
+
+    @staticmethod
+    def encode(value):
+        return value
+
+    @staticmethod
+    def decode(stored):
+        return stored
+
+    @classmethod
+    def make_storage(cls, values, dimensions):
+        return list(values)
+
+    @classmethod
+    def full(cls, dimensions, value):
+        """
+        makes an array of one value given dimensions
+        """
+        size = prod(dimensions)
+        return cls(dimensions, cls.make_storage([cls.encode(value)] * size, dimensions))
+
+    @classmethod
+    def from_nested(cls, nested, dimensions):
+        """
+        makes an array holding the values of nested lists
+        """
+        values = [cls.encode(value) for value in flatten(nested, dimensions)]
+        return cls(dimensions, cls.make_storage(values, dimensions))
+
+    def index(self, coordinates):
+        """
+        gets the flat index of coordinates
+        """
+        return self.offset + sum(
+            coordinate * stride for coordinate, stride in zip(coordinates, self.strides)
+        )
+
+    def get(self, coordinates):
+        return self.decode(self.data[self.index(coordinates)])
+
+    def set(self, coordinates, value):
+        self.data[self.index(coordinates)] = self.encode(value)
+
+    def __len__(self):
+        return self.dimensions[0]
+
+    def _row_offset(self, key):
+        if key < 0:
+            key += self.dimensions[0]
+        if not 0 <= key < self.dimensions[0]:
+            raise IndexError("index out of range")
+        return self.offset + key * self.strides[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.get(key)
+        offset = self._row_offset(key)
+        if len(self.dimensions) == 1:
+            return self.decode(self.data[offset])
+        return type(self)(self.dimensions[1:], self.data, offset)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, tuple):
+            self.set(key, value)
+        elif len(self.dimensions) == 1:
+            self.data[self._row_offset(key)] = self.encode(value)
+        else:
+            raise TypeError("can only set single values")
+
+    def __iter__(self):
+        for key in range(len(self)):
+            yield self[key]
+
+    def tolist(self):
+        """
+        gets the values as nested lists
+        """
+        stored = self.data[self.offset : self.offset + prod(self.dimensions)]
+        return nest([self.decode(value) for value in stored], self.dimensions)
+
+    def __eq__(self, other):
+        if isinstance(other, FlatArray):
+            other = other.tolist()
+        return self.tolist() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+
+BOMB = -1
+
+
+class FlatBoard(FlatArray):
+    """
+    board values, stored as small ints with BOMB for '.'
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def encode(value):
+        return BOMB if value == "." else value
+
+    @staticmethod
+    def decode(stored):
+        return "." if stored == BOMB else stored
+
+    @classmethod
+    def make_storage(cls, values, dimensions):
+        # sized from the values themselves: a bomb listed twice is counted
+        # twice, so counts can go past the 3**N - 1 neighbors a cell has
+        return array("b" if max(values, default=0) < 128 else "q", values)
+
+
+class FlatMask(FlatArray):
+    """
+    hidden flags, stored one byte each
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def encode(value):
+        return 1 if value else 0
+
+    @staticmethod
+    def decode(stored):
+        return bool(stored)
+
+    @classmethod
+    def make_storage(cls, values, dimensions):
+        return bytearray(values)
+
+
+def as_flat(values, flat_class, dimensions):
+    """
+    gets a flat array for a board or hidden array given as nested lists or
+    as a flat array already
+    """
+    if isinstance(values, FlatArray):
+        return values
+    return flat_class.from_nested(values, dimensions)
+
+
+def get_flat_game(game):
+    """
+    switches the board and hidden arrays of game over to flat storage if
+    they are nested lists, returns (board, hidden)
+    """
+    board = game["board"] = as_flat(game["board"], FlatBoard, game["dimensions"])
+    hidden = game["hidden"] = as_flat(game["hidden"], FlatMask, game["dimensions"])
+    return board, hidden
+
+
 # Helper functions
 
 
@@ -28,6 +252,8 @@ def get_value(board, coordinates):
     """
     gets value of coordinates in a board
     """
+    if isinstance(board, FlatArray):
+        return board.get(coordinates)
     value = board[coordinates[0]]
     if len(coordinates) > 1:
         value = board[coordinates[0]]
@@ -40,6 +266,9 @@ def set_value(board, coordinates, value):
     """
     sets value of coordinates in a board
     """
+    if isinstance(board, FlatArray):
+        board.set(coordinates, value)
+        return
     if len(coordinates) == 1:
         board[coordinates[0]] = value
     else:
@@ -53,91 +282,15 @@ def get_state(game, coordinates):
     """
     checks if game is over, returns state
     """
-    if get_value(game["board"], coordinates) == ".":
+    board = as_flat(game["board"], FlatBoard, game["dimensions"])
+    hidden = as_flat(game["hidden"], FlatMask, game["dimensions"])
+    if board.get(coordinates) == ".":
         return "defeat"
-
-    bombs = 0
-    hidden_tiles = 0
-    for coordinate in get_possible_coordinates(game["dimensions"]):
-        item = get_value(game["board"], coordinate)
-        hidden = get_value(game["hidden"], coordinate)
-        if item == ".":
-            bombs += 1
-        if hidden:
-            hidden_tiles += 1
-    if bombs == hidden_tiles:
+    if board.data.count(BOMB) == hidden.data.count(1):
         return "victory"
     return "ongoing"
 
 
-def get_neighbors(dimensions, coordinates):
-    """
-    gets all the neighbors of coordinates given a game
-    """
-    neighbors = set()
-    for shift in (-1, 0, 1):
-        new_value = coordinates[0] + shift
-        if len(coordinates) == 1:
-            if 0 <= new_value < dimensions[0]:
-                neighbors.add((new_value,))
-        else:
-            new_neighbors = get_neighbors(dimensions[1:], coordinates[1:])
-            for neighbor in new_neighbors:
-                new_coordinate = (new_value,) + neighbor
-                neighbors.add(new_coordinate)
-                for index, value in enumerate(new_coordinate):
-                    if not 0 <= value < dimensions[index]:
-                        neighbors.discard(new_coordinate)
-    return neighbors
-
-
-def get_every_0_neighbor(game, coordinates):
-    """
-    gets every neighbor for a clump of 0 tiles
-    """
-    every_neighbor = {coordinates}
-    visited = {coordinates}
-    agenda = [coordinates]
-    while agenda:
-        value = agenda.pop()
-        for neighbor in get_neighbors(game["dimensions"], value):
-            if neighbor not in visited:
-                every_neighbor.add(neighbor)
-                visited.add(neighbor)
-                if get_value(game["board"], neighbor) == 0:
-                    agenda.append(neighbor)
-
-    return every_neighbor
-
-
-def get_possible_coordinates(dimensions):
-    """
-    gets all the possible coordinates of a game
-    """
-    coordinates = set()
-    if len(dimensions) == 1:
-        for value in range(dimensions[0]):
-            coordinates.add((value,))
-    else:
-        for value in range(dimensions[0]):
-            for coordinate in get_possible_coordinates(dimensions[1:]):
-                coordinates.add((value,) + coordinate)
-    return coordinates
-
-
-def make_array(dimensions, value):
-    """
-    makes an array of one value given dimensions
-    """
-    if len(dimensions) == 1:
-        return [value] * dimensions[0]
-    else:
-        array = []
-        for _ in range(dimensions[0]):
-            array.append(make_array(dimensions[1:], value))
-        return array
-
-
 # 2-D IMPLEMENTATION
 
 
@@ -335,19 +488,20 @@ def new_game_nd(dimensions, bombs):
     state: ongoing
     """
 
-    board = make_array(dimensions, 0)
+    strides = get_strides(dimensions)
+    data = [0] * prod(dimensions)
 
     for bomb in bombs:
-        set_value(board, bomb, ".")
-        for neighbor in get_neighbors(dimensions, bomb):
-            value = get_value(board, neighbor)
-            if isinstance(value, int):
-                set_value(board, neighbor, value + 1)
+        index = sum(coordinate * stride for coordinate, stride in zip(bomb, strides))
+        data[index] = BOMB
+        for neighbor in get_flat_neighbors(dimensions, strides, index):
+            if data[neighbor] != BOMB:
+                data[neighbor] += 1
 
     return {
         "dimensions": dimensions,
-        "board": board,
-        "hidden": make_array(dimensions, True),
+        "board": FlatBoard(dimensions, FlatBoard.make_storage(data, dimensions)),
+        "hidden": FlatMask.full(dimensions, True),
         "state": "ongoing",
     }
 
@@ -412,21 +566,26 @@ def dig_nd(game, coordinates):
     state: defeat
     """
 
-    if not get_value(game["hidden"], coordinates):
+    board, hidden = get_flat_game(game)
+    index = board.index(coordinates)
+    if not hidden.data[index]:
         return 0
 
-    set_value(game["hidden"], coordinates, False)
-
-    game["state"] = get_state(game, coordinates)
-
-    if get_value(game["board"], coordinates) != 0:
-        return 1
-    else:
-        revealed = 1
-        for neighbor in get_every_0_neighbor(game, coordinates):
-            if get_value(game["hidden"], neighbor):
-                set_value(game["hidden"], neighbor, False)
-                revealed += 1
+    hidden.data[index] = 0
+    revealed = 1
+    if board.data[index] == 0:  # reveals the whole clump of 0 tiles
+        visited = {index}
+        agenda = [index]
+        while agenda:
+            value = agenda.pop()
+            for neighbor in get_flat_neighbors(board.dimensions, board.strides, value):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    if hidden.data[neighbor]:
+                        hidden.data[neighbor] = 0
+                        revealed += 1
+                    if board.data[neighbor] == 0:
+                        agenda.append(neighbor)
 
     game["state"] = get_state(game, coordinates)
 
@@ -467,26 +626,17 @@ def render_nd(game, xray=False):
      [['.', '3'], ['3', '.'], ['1', '1'], [' ', ' ']]]
     """
 
-    def render_row(row, hidden_row, xray=False):
-        rendered_row = []
-        if isinstance(row[0], (int, str)):
-            for value, hidden in zip(row, hidden_row):
-                if not xray and hidden:
-                    rendered_row.append("_")
-                elif value == 0:
-                    rendered_row.append(" ")
-                else:
-                    rendered_row.append(str(value))
+    board = as_flat(game["board"], FlatBoard, game["dimensions"])
+    hidden = as_flat(game["hidden"], FlatMask, game["dimensions"])
+    rendered = []
+    for value, hidden_value in zip(board.data, hidden.data):
+        if not xray and hidden_value:
+            rendered.append("_")
+        elif value == 0:
+            rendered.append(" ")
         else:
-            for next_row, next_hidden_row in zip(row, hidden_row):
-                rendered_row.append(render_row(next_row, next_hidden_row, xray))
-        return rendered_row
-
-    rendered_board = []
-    for row, hidden_row in zip(game["board"], game["hidden"]):
-        rendered_board.append(render_row(row, hidden_row, xray))
-
-    return rendered_board
+            rendered.append(str(board.decode(value)))
+    return nest(rendered, board.dimensions)
 
 
 # testing
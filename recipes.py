@@ -4,8 +4,16 @@
 - utilizes recursion to design algorithms
 """
 
-import pickle
 import sys
+import json
+import mmap
+import array
+import heapq
+import pickle
+import struct
+import itertools
+import threading
+from collections import OrderedDict, deque
 
 sys.setrecursionlimit(20_000)
 
@@ -51,46 +59,886 @@ def remove_forbidden(recipe_book, atomic_costs, forbidden):
                 del atomic_costs[ingredient]
 
 
-def recipe_cost(recipes, recipe, forbidden=None):
+class RecipeDB:
     """
-    finds the cost of a recipe
-    """
-    cost = 0
+    recipes list indexed once, so queries don't rebuild the recipe book and
+    atomic costs at every level of recursion
 
-    for ingredient in recipe:
-        try:
-            cost += lowest_cost(recipes, ingredient[0], forbidden) * ingredient[1]
-        except TypeError:
-            return None
+    every food item gets an integer id, and the recipes form a dependency DAG
+    over the ids: recipes[id] lists the ingredient lists of a compound item as
+    [(ingredient id, quantity)...] and users[id] is the set of compound items
+    with a recipe that uses it
 
-    return cost
+    recipe files can define items in terms of each other. the strongly
+    connected components of the graph are found when it is first queried:
+    the costs of items in a cycle are found by relaxing the whole component
+    until nothing changes, and flat recipes never use an item inside its
+    own recipe. cycles() reports them
 
+    prices and recipes can be changed after it is built: only the items whose
+    lowest cost can change are costed again. every method holds a lock, so a
+    query sees the recipes either before or after an update, never halfway;
+    the generators take a copy of what they need before yielding anything
 
-def lowest_cost(recipes, food_item, forbidden=None):
-    """
-    Given a recipes list and the name of a food item, return the lowest cost of
-    a full recipe for the given food item.
+    RecipeDB.open reads a file written by compile_recipes through a memory
+    map instead, decoding items only as queries reach them
     """
-    recipe_book = make_recipe_book(recipes)
-    atomic_costs = make_atomic_costs(recipes)
-    remove_forbidden(recipe_book, atomic_costs, forbidden)
 
-    if food_item in atomic_costs:  # base case for atomic
-        return atomic_costs[food_item]
+    memo_limit = 64  # items with more flat recipes than this are streamed
+
+    def __init__(self, recipes=(), table_cache_size=128):
+        self.table_cache_size = table_cache_size
+        self.names = []  # id -> food item name
+        self.ids = {}  # food item name -> id
+        self.atomic_costs = []  # id -> cost, None if it isn't atomic
+        self.recipes = []  # id -> list of ingredient lists, [] if not compound
+        self.users = []  # id -> set of compound ids using it as an ingredient
+        self._order = None  # ids in topological order, ingredients first
+        self._position = {}  # id -> index in the topological order
+        self._components = []  # strongly connected components, in order
+        self._component_of = {}  # id -> index of its component
+        self._cyclic = frozenset()  # ids in a cycle
+        self._tables = OrderedDict()  # (kind, forbidden ids) -> table
+        self._lock = threading.RLock()
+        self._mmap = None  # set by open, the structures above are views of it
+        self._views = []
+        for kind, name, value in recipes:
+            if kind == "compound":
+                self._add_recipe(name, value)
+            elif kind == "atomic":
+                self.atomic_costs[self._intern(name)] = value
+
+    @classmethod
+    def open(cls, filename):
+        """
+        opens a file written by compile_recipes. the arrays are memory mapped,
+        so opening is instant and only the items that queries reach are read
+        """
+        db = cls()
+        with open(filename, "rb") as file:
+            db._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if (
+            len(db._mmap) < RECIPE_HEADER.size
+            or db._mmap[: len(RECIPE_MAGIC)] != RECIPE_MAGIC
+        ):
+            db._release()
+            raise ValueError(f"{filename} is not a compiled recipes file")
+        header = RECIPE_HEADER.unpack_from(db._mmap)
+        if header[1] != (sys.byteorder == "little"):
+            db._release()
+            raise ValueError(f"{filename} was compiled with a different byteorder")
+        (
+            num_items,
+            num_recipes,
+            num_entries,
+            name_bytes,
+            num_components,
+            cost_type,
+            quantity_type,
+            table_type,
+        ) = header[2:]
+        cost_type, quantity_type = chr(cost_type), chr(quantity_type)
+        view = memoryview(db._mmap)
+        db._views = [view]
+        position = RECIPE_HEADER.size
+
+        def take(typecode, count):
+            nonlocal position
+            size = array.array(typecode).itemsize * count
+            part = view[position : position + size].cast(typecode)
+            db._views.append(part)
+            position += size + (-size % 8)
+            return part
+
+        name_offsets = take("q", num_items + 1)
+        by_name = take("q", num_items)
+        blob = take("B", name_bytes)
+        db.names = _NameView(name_offsets, blob)
+        db.ids = _NameIndex(db.names, by_name)
+        atomic_flags = take("b", num_items)
+        db.atomic_costs = _OptionalView(atomic_flags, take(cost_type, num_items))
+        db.recipes = _RecipeView(
+            take("q", num_items + 1),
+            take("q", num_recipes + 1),
+            take("q", num_entries),
+            take(quantity_type, num_entries),
+        )
+        db._order = take("q", num_items)
+        db._position = take("q", num_items)
+        db._components = _ComponentView(db._order, take("q", num_components + 1))
+        db._component_of = take("q", num_items)
+        db._cyclic = _FlagSet(take("b", num_items))
+        if table_type:  # the costs with nothing forbidden, ready to use
+            makeable = take("b", num_items)
+            costs = _OptionalView(makeable, take(chr(table_type), num_items))
+            choices = _ChoiceView(db.recipes, take("q", num_items))
+            db._tables["costs", frozenset()] = costs, choices
+        return db
+
+    def close(self):
+        """
+        releases the memory map of a database made by open, which leaves it
+        empty
+        """
+        with self._lock:
+            if self._mmap is None:
+                return
+            self._release()
+            self.names, self.ids, self.atomic_costs = [], {}, []
+            self.recipes, self.users = [], []
+            self._order = None
+            self._tables.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _thaw(self):
+        """
+        copies a memory mapped database into ordinary lists and releases the
+        map, so that it can be changed
+        """
+        if self._mmap is None:
+            return
+        self.names = [self.names[item] for item in range(len(self.names))]
+        self.ids = {name: item for item, name in enumerate(self.names)}
+        self.atomic_costs = [self.atomic_costs[item] for item in self.ids.values()]
+        self.recipes = [self.recipes[item] for item in self.ids.values()]
+        self.users = [set() for _ in self.names]
+        for compound, recipes in enumerate(self.recipes):
+            for recipe in recipes:
+                for ingredient, _ in recipe:
+                    self.users[ingredient].add(compound)
+        self._order = None
+        self._tables.clear()
+        self._release()
+
+    def _release(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._mmap = None
+
+    def _intern(self, name):
+        """
+        returns the id of a food item name, giving it a new id if needed
+        """
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.atomic_costs.append(None)
+            self.recipes.append([])
+            self.users.append(set())
+            for (kind, _), table in self._tables.items():
+                if kind == "counts":
+                    table.append(0)  # nothing makes it yet
+            if self._order is not None:  # nothing uses it yet, so it can go last
+                item = self.ids[name]
+                self._position[item] = len(self._order)
+                self._order.append(item)
+                self._component_of[item] = len(self._components)
+                self._components.append([item])
+        return self.ids[name]
+
+    def _add_recipe(self, name, ingredients):
+        """
+        adds a recipe for the compound item name, returns the compound's id
+        """
+        recipe = [(self._intern(item), quantity) for item, quantity in ingredients]
+        compound = self._intern(name)
+        # replaced rather than appended to, so snapshots taken by the
+        # generators keep the old list
+        self.recipes[compound] = self.recipes[compound] + [recipe]
+        for ingredient, _ in recipe:
+            self.users[ingredient].add(compound)
+            if self._order is None:
+                continue
+            component = self._component_of[compound]
+            if self._component_of[ingredient] > component or (
+                self._component_of[ingredient] == component
+                and compound not in self._cyclic
+            ):
+                self._order = None  # makes a new cycle or breaks the order
+        return compound
+
+    def add_recipe(self, name, ingredients):
+        """
+        adds a recipe (list of (ingredient, quantity)) for the compound item
+        name and updates the costs that it lowers
+        """
+        with self._lock:
+            self._thaw()
+            compound = self._add_recipe(name, ingredients)
+            self._drop_tables("counts")
+            self._update_costs({compound})
+
+    def remove_recipe(self, name, ingredients):
+        """
+        removes one recipe (list of (ingredient, quantity)) for the compound
+        item name and updates the costs that depended on it
+        raises a KeyError (and changes nothing) if there is no such recipe
+        """
+        with self._lock:
+            self._thaw()
+            if name not in self.ids or any(
+                item not in self.ids for item, _ in ingredients
+            ):
+                raise KeyError((name, ingredients))
+            compound = self.ids[name]
+            recipe = [(self.ids[item], quantity) for item, quantity in ingredients]
+            recipes = list(self.recipes[compound])
+            if recipe not in recipes:
+                raise KeyError((name, ingredients))
+            recipes.remove(recipe)
+            self.recipes[compound] = recipes
+            still_used = {ingredient for other in recipes for ingredient, _ in other}
+            for ingredient, _ in recipe:
+                if ingredient not in still_used:
+                    self.users[ingredient].discard(compound)
+                if self._order is not None and (
+                    self._component_of[ingredient] == self._component_of[compound]
+                ):
+                    self._order = None  # the cycle it was part of may be gone
+            self._drop_tables("counts")
+            self._update_costs({compound})
+
+    def update_atomic_cost(self, item, new_cost):
+        """
+        sets the cost of the atomic item (None makes it not atomic any more)
+        and updates the costs of everything that uses it
+        """
+        with self._lock:
+            self._thaw()
+            atomic = self._intern(item)
+            if (self.atomic_costs[atomic] is None) != (new_cost is None):
+                self._drop_tables("counts")
+            self.atomic_costs[atomic] = new_cost
+            self._update_costs({atomic})
+
+    def _drop_tables(self, kind):
+        for key in [key for key in self._tables if key[0] == kind]:
+            del self._tables[key]
+
+    def _update_costs(self, changed):
+        """
+        costs the items in changed again in every cached costs table, then
+        their users in topological order, stopping wherever an item's lowest
+        cost and cheapest recipe stay the same
+        """
+        self._topological_order()
+        for (kind, forbidden), table in self._tables.items():
+            if kind != "costs":
+                continue
+            costs, choices = table
+            costs.extend([None] * (len(self.names) - len(costs)))
+            choices.extend([None] * (len(self.names) - len(choices)))
+            agenda = list({self._component_of[item] for item in changed})
+            heapq.heapify(agenda)
+            queued = set(agenda)
+            while agenda:
+                index = heapq.heappop(agenda)
+                component = self._components[index]
+                for item in self._evaluate(component, forbidden, costs, choices):
+                    for user in self.users[item]:  # always in a later component
+                        user_index = self._component_of[user]
+                        if user_index not in queued:
+                            queued.add(user_index)
+                            heapq.heappush(agenda, user_index)
+
+    def _forbidden_ids(self, forbidden):
+        """
+        returns frozenset of the ids of the forbidden names that are known
+        """
+        if not forbidden:
+            return frozenset()
+        return frozenset(self.ids[name] for name in forbidden if name in self.ids)
+
+    def _topological_order(self):
+        """
+        returns list of every id with each item after all of its ingredients,
+        where the items of a cycle come together in one component
+
+        finds the strongly connected components with tarjan's algorithm (with
+        an explicit stack, so deep recipes are fine), which finishes every
+        component after the components of its ingredients
+        """
+        if self._order is not None:
+            return self._order
+        index = {}  # id -> order it was first reached in
+        low = {}  # id -> lowest index reachable from it while on the stack
+        stack = []
+        on_stack = set()
+        components = []
+        for root in range(len(self.names)):
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, self._ingredients(root))]
+            while work:
+                item, ingredients = work[-1]
+                for ingredient in ingredients:
+                    if ingredient not in index:
+                        index[ingredient] = low[ingredient] = len(index)
+                        stack.append(ingredient)
+                        on_stack.add(ingredient)
+                        work.append((ingredient, self._ingredients(ingredient)))
+                        break
+                    if ingredient in on_stack:
+                        low[item] = min(low[item], index[ingredient])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[item])
+                    if low[item] == index[item]:  # item is the component's root
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == item:
+                                break
+                        components.append(component)
+        self._components = components
+        self._component_of = {
+            item: number
+            for number, component in enumerate(components)
+            for item in component
+        }
+        self._cyclic = frozenset(
+            item
+            for component in components
+            if len(component) > 1 or component[0] in self._ingredients(component[0])
+            for item in component
+        )
+        self._order = [item for component in components for item in component]
+        self._position = {item: number for number, item in enumerate(self._order)}
+        return self._order
+
+    def _ingredients(self, item):
+        """
+        returns iterator over the ingredient ids of every recipe for item
+        """
+        return (
+            ingredient for recipe in self.recipes[item] for ingredient, _ in recipe
+        )
+
+    def _cached(self, kind, forbidden, build):
+        """
+        returns build(forbidden), cached for the most recently used
+        (kind, forbidden set) pairs
+        """
+        key = kind, forbidden
+        if key in self._tables:
+            self._tables.move_to_end(key)
+            return self._tables[key]
+        self._tables[key] = value = build(forbidden)
+        while len(self._tables) > self.table_cache_size:
+            self._tables.popitem(last=False)
+        return value
+
+    def _costs(self, forbidden):
+        """
+        returns (costs, choices) for a frozenset of forbidden ids: costs[id] is
+        the lowest cost of the item (None if it can't be made) and choices[id]
+        its first cheapest recipe (None for atomic items)
+        """
+        return self._cached("costs", forbidden, self._build_costs)
+
+    def _build_costs(self, forbidden):
+        costs = [None] * len(self.names)
+        choices = [None] * len(self.names)
+        self._topological_order()
+        for component in self._components:  # each one after its ingredients
+            self._evaluate(component, forbidden, costs, choices)
+        return costs, choices
+
+    def _evaluate(self, component, forbidden, costs, choices):
+        """
+        costs the items of one component, once the components it uses are
+        costed, and returns list of the ids whose cost or recipe changed
+
+        the items of a cycle start out unmakeable and every round costs each
+        of them again with the latest costs of the others, like bellman-ford.
+        an item only switches recipe when that makes it strictly cheaper, so
+        the chosen recipes never go round a cycle, and a cheapest recipe
+        never needs an item inside its own recipe, so len(component) rounds
+        are enough for the costs to settle
+        """
+        old = [(costs[item], choices[item]) for item in component]
+        if component[0] not in self._cyclic:
+            item = component[0]
+            costs[item], choices[item] = self._best_recipe(item, forbidden, costs)
+        else:
+            for item in component:
+                costs[item] = choices[item] = None
+            for _ in range(len(component) + 1):
+                improved = False
+                for item in component:
+                    cost, choice = self._best_recipe(item, forbidden, costs)
+                    if cost is not None and (costs[item] is None or cost < costs[item]):
+                        costs[item], choices[item] = cost, choice
+                        improved = True
+                if not improved:
+                    break
+        return [
+            item
+            for item, (cost, choice) in zip(component, old)
+            if costs[item] != cost or choices[item] is not choice
+        ]
+
+    def _best_recipe(self, item, forbidden, costs):
+        """
+        returns (lowest cost, first cheapest recipe) of item given the costs
+        of its ingredients, (None, None) if it can't be made
+        """
+        if item in forbidden:
+            return None, None
+        if self.atomic_costs[item] is not None:
+            return self.atomic_costs[item], None
+        lowest = choice = None
+        for recipe in self.recipes[item]:
+            cost = self._recipe_cost(recipe, costs)
+            if cost is not None and (lowest is None or cost < lowest):
+                lowest, choice = cost, recipe
+        return lowest, choice
+
+    def _counts(self, forbidden):
+        """
+        returns list of the number of flat recipes of each id
+        """
+        return self._cached("counts", forbidden, self._build_counts)
+
+    def _build_counts(self, forbidden):
+        counts = [0] * len(self.names)
+        self._topological_order()
+        for component in self._components:
+            if component[0] in self._cyclic:
+                members = set(component)
+                memo = {}
+                for item in component:
+                    counts[item] = self._count_in_cycle(
+                        item, frozenset(), members, forbidden, counts, memo
+                    )
+                continue
+            item = component[0]
+            if item in forbidden:
+                continue
+            if self.atomic_costs[item] is not None:
+                counts[item] = 1
+                continue
+            for recipe in self.recipes[item]:
+                if not recipe:  # mixes nothing, so makes no flat recipes
+                    continue
+                count = 1
+                for ingredient, _ in recipe:
+                    count *= counts[ingredient]
+                counts[item] += count
+        return counts
+
+    def _count_in_cycle(self, item, path, members, forbidden, counts, memo):
+        """
+        returns the number of flat recipes of item, a member of a cycle, that
+        don't use any of the items in path (those being made further up)
+        """
+        if item in forbidden:
+            return 0
+        if self.atomic_costs[item] is not None:
+            return 1
+        key = item, path
+        if key in memo:
+            return memo[key]
+        path = path | {item}
+        total = 0
+        for recipe in self.recipes[item]:
+            if not recipe or any(ingredient in path for ingredient, _ in recipe):
+                continue
+            count = 1
+            for ingredient, _ in recipe:
+                if ingredient in members:
+                    count *= self._count_in_cycle(
+                        ingredient, path, members, forbidden, counts, memo
+                    )
+                else:
+                    count *= counts[ingredient]
+            total += count
+        memo[key] = total
+        return total
+
+    @staticmethod
+    def _recipe_cost(recipe, costs):
+        cost = 0
+        for ingredient, quantity in recipe:
+            if costs[ingredient] is None:
+                return None
+            cost += costs[ingredient] * quantity
+        return cost
+
+    def _flatten(self, needs, forbidden):
+        """
+        given a sparse vector (dictionary of id -> quantity) of items, returns
+        the sparse vector of atomic items needed to make all of them with
+        their cheapest recipes, or None if one of them can't be made
+        """
+        costs, choices = self._costs(forbidden)
+        reached = set()
+        stack = list(needs)
+        while stack:  # everything the cheapest recipes use
+            item = stack.pop()
+            if item in reached:
+                continue
+            if costs[item] is None:
+                return None
+            reached.add(item)
+            if choices[item] is not None:
+                stack.extend(ingredient for ingredient, _ in choices[item])
+        # an item is passed on to its ingredients once every item using it
+        # has been, so its total is known by then
+        waiting = dict.fromkeys(reached, 0)  # id -> uses not passed on yet
+        for item in reached:
+            for ingredient, _ in choices[item] or ():
+                waiting[ingredient] += 1
+        ready = [item for item in reached if not waiting[item]]
+        needs = dict(needs)
+        flat_recipe = {}
+        while ready:
+            item = ready.pop()
+            quantity = needs.pop(item)
+            if choices[item] is None:
+                flat_recipe[item] = quantity
+                continue
+            for ingredient, amount in choices[item]:
+                needs[ingredient] = needs.get(ingredient, 0) + quantity * amount
+                waiting[ingredient] -= 1
+                if not waiting[ingredient]:
+                    ready.append(ingredient)
+        return flat_recipe
+
+    def _named(self, vector):
+        """
+        turns a sparse vector of ids into a dictionary keyed by name
+        """
+        return {self.names[item]: quantity for item, quantity in vector.items()}
+
+    def _flat_recipe_snapshot(self, item, forbidden):
+        """
+        returns (usable, small, cyclic) for every id that item uses: usable
+        maps each compound to its recipes that have flat recipes, small maps
+        each item outside a cycle with at most memo_limit flat recipes to the
+        list of them, as dictionaries of atomic id -> quantity, and cyclic is
+        the set of ids in a cycle. the lists are built bottom up, so each one
+        is only made once
+        """
+        counts = self._counts(forbidden)
+        reached = {item}
+        stack = [item]
+        while stack:
+            for ingredient in self._ingredients(stack.pop()):
+                if ingredient not in reached and counts[ingredient]:
+                    reached.add(ingredient)
+                    stack.append(ingredient)
+        usable = {}
+        small = {}
+        snapshot = usable, small, self._cyclic
+        for ingredient in sorted(reached, key=self._position.__getitem__):
+            if self.atomic_costs[ingredient] is not None:
+                small[ingredient] = [{ingredient: 1}]
+                continue
+            usable[ingredient] = [
+                recipe
+                for recipe in self.recipes[ingredient]
+                if recipe and all(counts[used] for used, _ in recipe)
+            ]
+            if counts[ingredient] > self.memo_limit or ingredient in self._cyclic:
+                continue  # items in a cycle depend on what uses them
+            small[ingredient] = flat_recipes = []
+            for recipe in usable[ingredient]:
+                parts = [
+                    small.get(used) or list(self._stream(used, snapshot))
+                    for used, _ in recipe
+                ]
+                for mix in itertools.product(*parts):
+                    flat_recipes.append(self._mix({}, mix, recipe))
+        return snapshot
+
+    @staticmethod
+    def _mix(mixed, parts, recipe):
+        """
+        adds each flat recipe in parts, scaled by the quantity of the matching
+        ingredient in recipe, into the dictionary mixed and returns it
+        """
+        for flat_recipe, (_, quantity) in zip(parts, recipe):
+            for atomic, amount in flat_recipe.items():
+                mixed[atomic] = mixed.get(atomic, 0) + amount * quantity
+        return mixed
+
+    def _stream(self, item, snapshot, path=frozenset()):
+        """
+        yields the flat recipes of item, from the memoized lists where they
+        are small enough and otherwise by streaming the cross product of its
+        ingredients' flat recipes. path holds the items of item's cycle that
+        are being made further up, which its recipes can't use
+        """
+        usable, small, cyclic = snapshot
+        if item in small:
+            yield from small[item]
+            return
+        # an item outside every cycle can't reach anything further up
+        path = path | {item} if item in cyclic else frozenset()
+        for recipe in usable[item]:
+            if not any(ingredient in path for ingredient, _ in recipe):
+                yield from self._product(recipe, 0, snapshot, path)
+
+    def _product(self, recipe, index, snapshot, path):
+        """
+        yields every mix of flat recipes of recipe[index:], with the first
+        ingredient changing slowest. the later ingredients are streamed again
+        for each choice of the first instead of being stored
+        """
+        if index == len(recipe):
+            yield {}
+            return
+        ingredient, quantity = recipe[index]
+        for flat_recipe in self._stream(ingredient, snapshot, path):
+            for rest in self._product(recipe, index + 1, snapshot, path):
+                yield self._mix(rest, [flat_recipe], [(ingredient, quantity)])
+
+    def cycles(self):
+        """
+        returns list of the groups of items that are defined in terms of each
+        other, as dictionaries: "items" is the list of names in the group and
+        "cycle" one loop through them, like ["a", "b", "a"] when a uses b
+        and b uses a
+        """
+        with self._lock:
+            self._topological_order()
+            report = []
+            for component in self._components:
+                if component[0] not in self._cyclic:
+                    continue
+                members = set(component)
+                start = component[0]
+                parents = {}
+                queue = deque([start])
+                while start not in parents:  # breadth first back round to start
+                    item = queue.popleft()
+                    for ingredient in self._ingredients(item):
+                        if ingredient in members and ingredient not in parents:
+                            parents[ingredient] = item
+                            queue.append(ingredient)
+                cycle = [start]
+                while len(cycle) == 1 or cycle[-1] != start:
+                    cycle.append(parents[cycle[-1]])
+                report.append(
+                    {
+                        "items": sorted(self.names[item] for item in component),
+                        "cycle": [self.names[item] for item in reversed(cycle)],
+                    }
+                )
+            return report
+
+    def lowest_cost(self, food_item, forbidden=None):
+        """
+        returns the lowest cost of a full recipe for food_item, or None if it
+        can't be made without the forbidden items
+        """
+        with self._lock:
+            if food_item not in self.ids:
+                return None
+            costs, _ = self._costs(self._forbidden_ids(forbidden))
+            return costs[self.ids[food_item]]
 
-    if food_item not in recipe_book:  # base case if item is forbidden
-        return None
+    def recipe_cost(self, recipe, forbidden=None):
+        """
+        returns the cost of a list of (ingredient, quantity), or None if one
+        of the ingredients can't be made
+        """
+        with self._lock:
+            if any(item not in self.ids for item, _ in recipe):
+                return None
+            costs, _ = self._costs(self._forbidden_ids(forbidden))
+            return self._recipe_cost(
+                [(self.ids[item], quantity) for item, quantity in recipe], costs
+            )
+
+    def cheapest_flat_recipe(self, food_item, forbidden=None):
+        """
+        returns a dictionary mapping atomic items to quantities for the
+        cheapest full recipe of food_item, or None if there is none
+        """
+        with self._lock:
+            if food_item not in self.ids:
+                return None
+            flat_recipe = self._flatten(
+                {self.ids[food_item]: 1}, self._forbidden_ids(forbidden)
+            )
+            return None if flat_recipe is None else self._named(flat_recipe)
 
-    cost_list = [
-        recipe_cost(recipes, recipe, forbidden)
-        for recipe in recipe_book[food_item]
-        if recipe_cost(recipes, recipe, forbidden) is not None
-    ]  # find cost of every recipe
+    def cost_menu(self, entries):
+        """
+        costs a whole menu at once. entries is a list of (dish, quantity,
+        forbidden), returns (costs, grocery_list) where costs[i] is the lowest
+        cost of entries[i] (None if it can't be made) and grocery_list maps
+        atomic items to the total quantity needed for the dishes that can be
+        made
 
-    if not cost_list:  # check if recipe can be made
-        return None
+        dishes with the same forbidden items share one costs table, and their
+        quantities are added up and pushed down the cheapest recipes together
+        as one sparse vector, so shared sub-recipes are only expanded once
+        """
+        with self._lock:
+            costs = []
+            groups = {}  # forbidden ids -> sparse vector of dish quantities
+            for dish, quantity, forbidden in entries:
+                forbidden = self._forbidden_ids(forbidden)
+                dish = self.ids.get(dish)
+                lowest = None if dish is None else self._costs(forbidden)[0][dish]
+                if lowest is None:
+                    costs.append(None)
+                    continue
+                costs.append(lowest * quantity)
+                needs = groups.setdefault(forbidden, {})
+                needs[dish] = needs.get(dish, 0) + quantity
+            grocery_list = {}
+            for forbidden, needs in groups.items():
+                for item, quantity in self._flatten(needs, forbidden).items():
+                    grocery_list[item] = grocery_list.get(item, 0) + quantity
+            return costs, self._named(grocery_list)
 
-    return min(cost_list)
+    def iter_flat_recipes(self, food_item, forbidden=None, limit=None):
+        """
+        yields every possible flat recipe for food_item one at a time (at most
+        limit of them), without building the whole list first
+        """
+        with self._lock:
+            if food_item not in self.ids:
+                return
+            item = self.ids[food_item]
+            forbidden = self._forbidden_ids(forbidden)
+            if not self._counts(forbidden)[item]:
+                return
+            snapshot = self._flat_recipe_snapshot(item, forbidden)
+        flat_recipes = self._stream(item, snapshot)
+        for flat_recipe in itertools.islice(flat_recipes, limit):
+            yield {self.names[atomic]: amount for atomic, amount in flat_recipe.items()}
+
+    def all_flat_recipes(self, food_item, forbidden=None, limit=None):
+        """
+        returns a list of every possible flat recipe for food_item (at most
+        limit of them)
+        """
+        return list(self.iter_flat_recipes(food_item, forbidden, limit))
+
+    def count_flat_recipes(self, food_item, forbidden=None):
+        """
+        returns how many flat recipes all_flat_recipes would give, without
+        making them
+        """
+        with self._lock:
+            if food_item not in self.ids:
+                return 0
+            return self._counts(self._forbidden_ids(forbidden))[self.ids[food_item]]
+
+    def cheapest_flat_recipes(self, food_item, forbidden=None, limit=None):
+        """
+        yields (cost, flat recipe) for every possible flat recipe of
+        food_item, cheapest first (at most limit of them)
+
+        best first search over partly expanded recipes: a partial recipe is
+        the atomic items collected so far plus the items still to expand, and
+        its priority is its exact lowest cost, so complete ones come out of
+        the queue in order of cost
+        """
+        with self._lock:
+            if food_item not in self.ids:
+                return
+            costs, _ = self._costs(self._forbidden_ids(forbidden))
+            item = self.ids[food_item]
+            if costs[item] is None:
+                return
+            lowest = {}  # id -> lowest cost, for everything item can use
+            options = {}  # compound id -> [(cost, recipe)...] that can be made
+            stack = [item]
+            while stack:
+                current = stack.pop()
+                if current in lowest:
+                    continue
+                lowest[current] = costs[current]
+                if self.atomic_costs[current] is not None:
+                    continue
+                options[current] = []
+                for recipe in self.recipes[current]:
+                    cost = self._recipe_cost(recipe, costs)
+                    if cost is not None and recipe:  # as in all_flat_recipes
+                        options[current].append((cost, recipe))
+                        stack.extend(ingredient for ingredient, _ in recipe)
+
+            cyclic = self._cyclic
+
+        # pending items are (id, quantity, items of its cycle being made
+        # further up, which it can't use)
+        tie_breaker = itertools.count()
+        agenda = [(lowest[item], next(tie_breaker), (), ((item, 1, frozenset()),))]
+        found = 0
+        while agenda and (limit is None or found < limit):
+            cost, _, collected, pending = heapq.heappop(agenda)
+            if not pending:
+                flat_recipe = {}
+                for atomic, amount in collected:
+                    flat_recipe[self.names[atomic]] = (
+                        flat_recipe.get(self.names[atomic], 0) + amount
+                    )
+                found += 1
+                yield cost, flat_recipe
+                continue
+            (item, quantity, path), pending = pending[0], pending[1:]
+            if item not in options:  # atomic
+                heapq.heappush(
+                    agenda,
+                    (cost, next(tie_breaker), collected + ((item, quantity),), pending),
+                )
+                continue
+            base = cost - lowest[item] * quantity
+            path = path | {item} if item in cyclic else frozenset()
+            for recipe_cost, recipe in options[item]:
+                if any(ingredient in path for ingredient, _ in recipe):
+                    continue
+                expanded = tuple(
+                    (ingredient, quantity * amount, path)
+                    for ingredient, amount in recipe
+                )
+                heapq.heappush(
+                    agenda,
+                    (
+                        base + recipe_cost * quantity,
+                        next(tie_breaker),
+                        collected,
+                        expanded + pending,
+                    ),
+                )
+
+
+def recipe_cost(recipes, recipe, forbidden=None):
+    """
+    finds the cost of a recipe
+    """
+    return RecipeDB(recipes).recipe_cost(recipe, forbidden)
+
+
+def lowest_cost(recipes, food_item, forbidden=None):
+    """
+    Given a recipes list and the name of a food item, return the lowest cost of
+    a full recipe for the given food item.
+
+    Builds a RecipeDB for every call, so make one RecipeDB and use its methods
+    instead when asking many questions about the same recipes.
+    """
+    return RecipeDB(recipes).lowest_cost(food_item, forbidden)
 
 
 def scale_recipe(flat_recipe, n):
@@ -137,53 +985,24 @@ def cheapest_flat_recipe(recipes, food_item, forbidden=None):
 
     Returns None if there is no possible recipe.
     """
-    recipe_book = make_recipe_book(recipes)
-    atomic_costs = make_atomic_costs(recipes)
-    remove_forbidden(recipe_book, atomic_costs, forbidden)
-
-    if food_item in atomic_costs:  # atomic base case
-        return {food_item: 1}
-
-    if food_item not in recipe_book:  # forbidden base case
-        return None
-
-    def cheapest_recipe(recipe_list):
-        """
-        finds the cheapest recipe in a list of recipes
-        returns flat recipe
-        """
-        costs = [
-            recipe_cost(recipes, recipe, forbidden)
-            for recipe in recipe_list
-            if recipe_cost(recipes, recipe, forbidden) is not None
-        ]  # finds all costs of recipes
+    return RecipeDB(recipes).cheapest_flat_recipe(food_item, forbidden)
 
-        if not costs:
-            return None
 
-        lowest = min(costs)
-
-        for recipe in recipe_list:  # finds cheapest
-            if recipe_cost(recipes, recipe, forbidden) == lowest:
-                return recipe
-
-    cheapest = cheapest_recipe(recipe_book[food_item])
-
-    if cheapest is None:
-        return None
-
-    grocery_list = []
+def cost_menu(recipes, entries):
+    """
+    Given a recipes list and a list of (dish, quantity, forbidden) entries,
+    return (costs, grocery_list): the lowest cost of each entry (None if it
+    can't be made) and one grocery list for every dish that can be made.
+    """
+    return RecipeDB(recipes).cost_menu(entries)
 
-    for ingredient in cheapest:
-        cheap_recipe = cheapest_flat_recipe(
-            recipes, ingredient[0], forbidden
-        )  # recursively finds cheapest flat recipe for each ingredient
-        if cheap_recipe is None:
-            return None
-        scaled_recipe = scale_recipe(cheap_recipe, ingredient[1])
-        grocery_list.append(scaled_recipe)
 
-    return make_grocery_list(grocery_list)
+def recipe_cycles(recipes):
+    """
+    Given a recipes list, return a list of the groups of compound food items
+    that are defined in terms of each other (see RecipeDB.cycles).
+    """
+    return RecipeDB(recipes).cycles()
 
 
 def ingredient_mixes(flat_recipes):
@@ -222,44 +1041,318 @@ def ingredient_mixes(flat_recipes):
     return mixed_list
 
 
-def all_flat_recipes(recipes, food_item, forbidden=None):
+def all_flat_recipes(recipes, food_item, forbidden=None, limit=None):
     """
     Given a list of recipes and the name of a food item, produce a list (in any
-    order) of all possible flat recipes for that category.
+    order) of all possible flat recipes for that category, or only the first
+    limit of them.
 
     Returns an empty list if there are no possible recipes
     """
-    recipe_book = make_recipe_book(recipes)
-    atomic_costs = make_atomic_costs(recipes)
-    remove_forbidden(recipe_book, atomic_costs, forbidden)
+    return RecipeDB(recipes).all_flat_recipes(food_item, forbidden, limit)
+
+
+RECIPE_MAGIC = b"RECIPES1"
+RECIPE_HEADER = struct.Struct("<8s9q")
+# header: magic, byteorder flag, number of items, number of recipes, number of
+# ingredient entries, bytes of names, number of components, typecodes of the
+# atomic costs and the quantities, and the typecode of the stored lowest costs
+# with nothing forbidden (0 if they aren't stored)
+# then 8 byte aligned arrays: name offsets (items + 1), ids sorted by name,
+# utf-8 names, atomic flags, atomic costs, recipe offsets (items + 1), entry
+# offsets (recipes + 1), ingredient ids, quantities, topological order,
+# position in the order, component offsets (components + 1), component of each
+# id, cyclic flags and optionally makeable flags, lowest costs and the index
+# of the cheapest recipe (-1 if none)
+
+
+def _write_array(file, typecode, values):
+    """
+    writes values as a packed array and pads the file to 8 byte alignment
+    """
+    array.array(typecode, values).tofile(file)
+    file.write(b"\0" * (-file.tell() % 8))
 
-    if food_item in atomic_costs:  # atomic base case
-        return [{food_item: 1}]
 
-    if food_item not in recipe_book:  # forbidden base case
-        return []
+def _typecode(values):
+    """
+    returns the typecode of an array that holds values exactly: "q" for 64 bit
+    integers, "d" for floats (and small integers), or None if there is none
+    """
+    if all(isinstance(value, int) and -(2**63) <= value < 2**63 for value in values):
+        return "q"
+    if all(
+        isinstance(value, float) or (isinstance(value, int) and abs(value) <= 2**53)
+        for value in values
+    ):
+        return "d"
+    return None
+
+
+def compile_recipes(recipes, filename):
+    """
+    writes a recipes list (or a RecipeDB) to a compiled recipes file that
+    can be opened with RecipeDB.open
+    """
+    db = recipes if isinstance(recipes, RecipeDB) else RecipeDB(recipes)
+    with db._lock:
+        db._thaw()
+        order = db._topological_order()
+        costs, choices = db._costs(frozenset())
+        names = [name.encode("utf-8") for name in db.names]
+        name_offsets = [0]
+        for name in names:
+            name_offsets.append(name_offsets[-1] + len(name))
+        atomic = [cost for cost in db.atomic_costs if cost is not None]
+        recipe_offsets = [0]
+        entry_offsets = [0]
+        ingredients = []
+        quantities = []
+        for item_recipes in db.recipes:  # csr layout, one slice per item
+            for recipe in item_recipes:
+                for ingredient, quantity in recipe:
+                    ingredients.append(ingredient)
+                    quantities.append(quantity)
+                entry_offsets.append(len(ingredients))
+            recipe_offsets.append(len(entry_offsets) - 1)
+        component_offsets = [0]
+        for component in db._components:
+            component_offsets.append(component_offsets[-1] + len(component))
+        cost_type = _typecode(atomic)
+        quantity_type = _typecode(quantities)
+        if cost_type is None or quantity_type is None:
+            raise ValueError("costs and quantities must be integers or floats")
+        table_type = _typecode([cost for cost in costs if cost is not None])
+
+        with open(filename, "wb") as file:
+            file.write(b"\0" * RECIPE_HEADER.size)
+            _write_array(file, "q", name_offsets)
+            _write_array(file, "q", sorted(range(len(names)), key=names.__getitem__))
+            file.write(b"".join(names))
+            file.write(b"\0" * (-file.tell() % 8))
+            _write_array(file, "b", [cost is not None for cost in db.atomic_costs])
+            _write_array(file, cost_type, [cost or 0 for cost in db.atomic_costs])
+            _write_array(file, "q", recipe_offsets)
+            _write_array(file, "q", entry_offsets)
+            _write_array(file, "q", ingredients)
+            _write_array(file, quantity_type, quantities)
+            _write_array(file, "q", order)
+            _write_array(file, "q", [db._position[item] for item in range(len(names))])
+            _write_array(file, "q", component_offsets)
+            _write_array(
+                file, "q", [db._component_of[item] for item in range(len(names))]
+            )
+            _write_array(file, "b", [item in db._cyclic for item in range(len(names))])
+            if table_type is not None:
+                _write_array(file, "b", [cost is not None for cost in costs])
+                _write_array(file, table_type, [cost or 0 for cost in costs])
+                _write_array(
+                    file,
+                    "q",
+                    [
+                        -1 if choice is None else db.recipes[item].index(choice)
+                        for item, choice in enumerate(choices)
+                    ],
+                )
+            file.seek(0)
+            file.write(
+                RECIPE_HEADER.pack(
+                    RECIPE_MAGIC,
+                    sys.byteorder == "little",
+                    len(names),
+                    len(entry_offsets) - 1,
+                    len(ingredients),
+                    name_offsets[-1],
+                    len(db._components),
+                    ord(cost_type),
+                    ord(quantity_type),
+                    0 if table_type is None else ord(table_type),
+                )
+            )
+
+
+def read_recipes(filename):
+    """
+    loads a recipes list from a pickle file, or from a json file holding the
+    same list (with lists in place of tuples)
+    """
+    if filename.endswith(".json"):
+        with open(filename, encoding="utf-8") as f:
+            return [
+                (kind, name, value if kind == "atomic" else [tuple(i) for i in value])
+                for kind, name, value in json.load(f)
+            ]
+    with open(filename, "rb") as f:
+        return pickle.load(f)
+
+
+def convert_recipes(recipes_filename, filename):
+    """
+    converts an existing recipes pickle (or json) file into a compiled
+    recipes file
+    """
+    compile_recipes(read_recipes(recipes_filename), filename)
+
+
+def load_recipes(filename):
+    """
+    returns a RecipeDB for a compiled recipes file, or for a recipes pickle
+    or json file
+    """
+    with open(filename, "rb") as f:
+        if f.read(len(RECIPE_MAGIC)) == RECIPE_MAGIC:
+            return RecipeDB.open(filename)
+    return RecipeDB(read_recipes(filename))
+
+
+class _NameView:
+    """
+    id -> name lookups over the memory mapped names
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def encoded(self, item):
+        return bytes(self.blob[self.offsets[item] : self.offsets[item + 1]])
+
+    def __getitem__(self, item):
+        return self.encoded(item).decode("utf-8")
+
+
+class _NameIndex:
+    """
+    name -> id lookups, by binary search over the ids sorted by name
+    """
+
+    def __init__(self, names, by_name):
+        self.names = names
+        self.by_name = by_name
+
+    def get(self, name, default=None):
+        if not isinstance(name, str):
+            return default
+        encoded = name.encode("utf-8")
+        low, high = 0, len(self.by_name)
+        while low < high:
+            middle = (low + high) // 2
+            if self.names.encoded(self.by_name[middle]) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.by_name) and self.names.encoded(self.by_name[low]) == encoded:
+            return self.by_name[low]
+        return default
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __getitem__(self, name):
+        item = self.get(name)
+        if item is None:
+            raise KeyError(name)
+        return item
+
+
+class _OptionalView:
+    """
+    id -> value, or None where the flag for the id isn't set
+    """
+
+    def __init__(self, flags, values):
+        self.flags = flags
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, item):
+        return self.values[item] if self.flags[item] else None
+
+
+class _RecipeView:
+    """
+    id -> list of recipes, decoded from the csr arrays
+    """
+
+    def __init__(self, recipe_offsets, entry_offsets, ingredients, quantities):
+        self.recipe_offsets = recipe_offsets
+        self.entry_offsets = entry_offsets
+        self.ingredients = ingredients
+        self.quantities = quantities
+
+    def __len__(self):
+        return len(self.recipe_offsets) - 1
+
+    def __getitem__(self, item):
+        recipes = []
+        for recipe in range(self.recipe_offsets[item], self.recipe_offsets[item + 1]):
+            start, end = self.entry_offsets[recipe], self.entry_offsets[recipe + 1]
+            recipes.append(
+                list(
+                    zip(
+                        self.ingredients[start:end].tolist(),
+                        self.quantities[start:end].tolist(),
+                    )
+                )
+            )
+        return recipes
+
+
+class _ChoiceView:
+    """
+    id -> cheapest recipe, from the stored index of the recipe
+    """
+
+    def __init__(self, recipes, indices):
+        self.recipes = recipes
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, item):
+        index = self.indices[item]
+        return None if index < 0 else self.recipes[item][index]
+
+
+class _ComponentView:
+    """
+    index -> list of the ids in that strongly connected component
+    """
+
+    def __init__(self, order, offsets):
+        self.order = order
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.order[self.offsets[index] : self.offsets[index + 1]].tolist()
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+
+class _FlagSet:
+    """
+    set of the ids whose flag is set
+    """
 
-    all_recipes = []
-    for recipe in recipe_book[food_item]:
-        flat_recipes = []
-        for item in recipe:
-            not_scaled = all_flat_recipes(
-                recipes, item[0], forbidden
-            )  # finds a.f.r. for each item in recipe
-            scaled = []
-            for new_recipe in not_scaled:
-                scaled.append(scale_recipe(new_recipe, item[1]))  # scales each item
-            flat_recipes.append(scaled)
-        all_recipes.extend(
-            ingredient_mixes(flat_recipes)
-        )  # mixes flat recipes of each item and adds to output
+    def __init__(self, flags):
+        self.flags = flags
 
-    return all_recipes
+    def __contains__(self, item):
+        return bool(self.flags[item])
 
 
 if __name__ == "__main__":
     # load example recipes from section 3 of the write-up
-    with open("test_recipes/example_recipes.pickle", "rb") as f:
-        example_recipes = pickle.load(f)
+    example_db = load_recipes("test_recipes/example_recipes.pickle")
     # you are free to add additional testing code here!
-    print("output", all_flat_recipes(example_recipes, "burger"))
+    print("output", example_db.all_flat_recipes("burger"))
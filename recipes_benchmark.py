@@ -0,0 +1,398 @@
+"""
+benchmarks for the recipes queries
+generates layered recipe sets of controllable depth, branching factor and
+number of alternative recipes, then times lowest_cost, cheapest_flat_recipe
+and all_flat_recipes on them with several forbidden list sizes, recording
+peak memory and how many times the engine's inner steps run. the original
+recursive algorithm runs alongside as a reference (with a time limit), to
+show where its exponential behaviour starts
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+
+import recipes
+
+QUERIES = ("lowest_cost", "cheapest_flat_recipe", "all_flat_recipes")
+ENGINES = ("recursive", "functions", "db", "compiled")
+
+
+class ReferenceTimeout(Exception):
+    """
+    raised when the recursive reference engine runs past its time limit
+    """
+
+
+def generate_recipes(depth, branching, alternatives, width=10, seed=None):
+    """
+    makes a recipes list in layers: layer 0 is width atomic items and every
+    item of layer k has the given number of alternative recipes, each using
+    branching ingredients from layer k - 1 (sometimes from further down).
+    the top layer is a single item called "dish". returns (recipes, names)
+    """
+    rng = random.Random(seed)
+    layers = [[f"atomic_{i}" for i in range(width)]]
+    recipe_list = [("atomic", name, rng.randint(1, 20)) for name in layers[0]]
+    for level in range(1, depth + 1):
+        size = 1 if level == depth else width
+        if level == depth:
+            layer = ["dish"]
+        else:
+            layer = [f"item_{level}_{i}" for i in range(size)]
+        for name in layer:
+            for _ in range(alternatives):
+                ingredients = []
+                for _ in range(branching):
+                    below = level - 1
+                    if below and rng.random() < 0.2:  # skips a layer or more
+                        below = rng.randrange(below)
+                    ingredients.append((rng.choice(layers[below]), rng.randint(1, 3)))
+                recipe_list.append(("compound", name, ingredients))
+        layers.append(layer)
+    rng.shuffle(recipe_list)
+    names = [name for layer in layers for name in layer]
+    return recipe_list, names
+
+
+def forbidden_lists(names, size, count=3, seed=None):
+    """
+    returns count random forbidden lists of the given size, never forbidding
+    the dish itself
+    """
+    rng = random.Random(seed)
+    candidates = [name for name in names if name != "dish"]
+    return [rng.sample(candidates, min(size, len(candidates))) for _ in range(count)]
+
+
+@contextmanager
+def count_calls(counts):
+    """
+    while active, counts calls to the RecipeDB steps that the amount of work
+    depends on (name -> calls): costing an item, costing a recipe, mixing
+    flat recipes together and streaming an item's flat recipes
+    """
+    originals = {}
+
+    def counted(name, function):
+        counts.setdefault(name, 0)
+
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    hooks = {
+        "_best_recipe": "items costed",
+        "_recipe_cost": "recipes costed",
+        "_mix": "flat recipes mixed",
+        "_stream": "items streamed",
+    }
+    for attribute, name in hooks.items():
+        original = recipes.RecipeDB.__dict__[attribute]
+        originals[attribute] = original
+        if isinstance(original, staticmethod):
+            wrapped = staticmethod(counted(name, original.__func__))
+        else:
+            wrapped = counted(name, original)
+        setattr(recipes.RecipeDB, attribute, wrapped)
+    try:
+        yield counts
+    finally:
+        for attribute, original in originals.items():
+            setattr(recipes.RecipeDB, attribute, original)
+
+
+def reference_engine(recipe_list, time_limit, counts=None):
+    """
+    returns a function (query, food item, forbidden) -> result that answers
+    with the original recursive algorithm: it builds the recipe book again
+    at every level and shares nothing between calls, so its time grows
+    exponentially with the depth. counts["recursive calls"] counts its calls
+    and it raises ReferenceTimeout once time_limit seconds have passed
+    """
+    deadline = time.perf_counter() + time_limit
+    counts = {} if counts is None else counts
+    counts.setdefault("recursive calls", 0)
+
+    def indexed(forbidden):
+        counts["recursive calls"] += 1
+        if time.perf_counter() > deadline:
+            raise ReferenceTimeout
+        recipe_book = recipes.make_recipe_book(recipe_list)
+        atomic_costs = recipes.make_atomic_costs(recipe_list)
+        recipes.remove_forbidden(recipe_book, atomic_costs, forbidden)
+        return recipe_book, atomic_costs
+
+    def recipe_cost(recipe, forbidden):
+        cost = 0
+        for ingredient, quantity in recipe:
+            ingredient_cost = lowest_cost(ingredient, forbidden)
+            if ingredient_cost is None:
+                return None
+            cost += ingredient_cost * quantity
+        return cost
+
+    def lowest_cost(food_item, forbidden):
+        recipe_book, atomic_costs = indexed(forbidden)
+        if food_item in atomic_costs:
+            return atomic_costs[food_item]
+        if food_item not in recipe_book:
+            return None
+        costs = [
+            recipe_cost(recipe, forbidden)
+            for recipe in recipe_book[food_item]
+            if recipe_cost(recipe, forbidden) is not None
+        ]
+        return min(costs) if costs else None
+
+    def cheapest_flat_recipe(food_item, forbidden):
+        recipe_book, atomic_costs = indexed(forbidden)
+        if food_item in atomic_costs:
+            return {food_item: 1}
+        if food_item not in recipe_book:
+            return None
+        costs = [
+            recipe_cost(recipe, forbidden)
+            for recipe in recipe_book[food_item]
+            if recipe_cost(recipe, forbidden) is not None
+        ]
+        if not costs:
+            return None
+        for recipe in recipe_book[food_item]:
+            if recipe_cost(recipe, forbidden) == min(costs):
+                break
+        parts = []
+        for ingredient, quantity in recipe:
+            flat_recipe = cheapest_flat_recipe(ingredient, forbidden)
+            if flat_recipe is None:
+                return None
+            parts.append(recipes.scale_recipe(flat_recipe, quantity))
+        return recipes.make_grocery_list(parts)
+
+    def all_flat_recipes(food_item, forbidden):
+        recipe_book, atomic_costs = indexed(forbidden)
+        if food_item in atomic_costs:
+            return [{food_item: 1}]
+        if food_item not in recipe_book:
+            return []
+        flat_recipes = []
+        for recipe in recipe_book[food_item]:
+            parts = [
+                [
+                    recipes.scale_recipe(flat_recipe, quantity)
+                    for flat_recipe in all_flat_recipes(ingredient, forbidden)
+                ]
+                for ingredient, quantity in recipe
+            ]
+            flat_recipes.extend(recipes.ingredient_mixes(parts))
+        return flat_recipes
+
+    queries = {
+        "lowest_cost": lowest_cost,
+        "cheapest_flat_recipe": cheapest_flat_recipe,
+        "all_flat_recipes": all_flat_recipes,
+    }
+    return lambda query, item, forbidden: queries[query](item, forbidden)
+
+
+@contextmanager
+def make_engine(engine, recipe_list, compiled_file, reference_limit=None, counts=None):
+    """
+    while active, gives a function (query, food item, forbidden) -> result
+    for one way of answering queries: the original recursive algorithm (see
+    reference_engine, stopped after reference_limit seconds), the
+    module-level functions (which index the recipes on every call), one
+    RecipeDB built up front, or a compiled file, which is closed again
+    afterwards
+    """
+    if engine == "recursive":
+        yield reference_engine(recipe_list, reference_limit or float("inf"), counts)
+        return
+    if engine == "functions":
+        yield lambda query, item, forbidden: getattr(recipes, query)(
+            recipe_list, item, forbidden
+        )
+        return
+    if engine == "db":
+        db = recipes.RecipeDB(recipe_list)
+    else:
+        db = recipes.RecipeDB.open(compiled_file)
+    with db:
+        yield lambda query, item, forbidden: getattr(db, query)(item, forbidden)
+
+
+def time_query(answer, query, forbidden_sets):
+    """
+    runs one query for "dish" with each forbidden list, returns seconds per
+    query and the last result
+    """
+    started = time.perf_counter()
+    for forbidden in forbidden_sets:
+        result = answer(query, "dish", forbidden)
+    return (time.perf_counter() - started) / len(forbidden_sets), result
+
+
+def benchmark_case(
+    recipe_list,
+    names,
+    forbidden_size,
+    max_flat=100_000,
+    memory=True,
+    reference_limit=10,
+    skip_reference=(),
+):
+    """
+    times every query with every engine on one recipe set, returns list of
+    result dictionaries. all_flat_recipes is skipped when there are more than
+    max_flat flat recipes to make, the recursive engine gives up ("timeout")
+    after reference_limit seconds and isn't run at all for the queries in
+    skip_reference
+    """
+    db = recipes.RecipeDB(recipe_list)
+    forbidden_sets = forbidden_lists(names, forbidden_size, seed=len(recipe_list))
+    flat_counts = [
+        db.count_flat_recipes("dish", forbidden) for forbidden in forbidden_sets
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        compiled_file = os.path.join(folder, "recipes.bin")
+        recipes.compile_recipes(recipe_list, compiled_file)
+        for engine in ENGINES:
+            for query in QUERIES:
+                result = {
+                    "engine": engine,
+                    "query": query,
+                    "flat_recipes": max(flat_counts),
+                }
+                if (
+                    query == "all_flat_recipes" and max(flat_counts) > max_flat
+                ) or (engine == "recursive" and query in skip_reference):
+                    result["status"] = "skipped"
+                    results.append(result)
+                    continue
+                counts = {}
+                try:
+                    with count_calls(counts), make_engine(
+                        engine, recipe_list, compiled_file, reference_limit, counts
+                    ) as answer:
+                        seconds, _ = time_query(answer, query, forbidden_sets)
+                except ReferenceTimeout:
+                    result["status"] = "timeout"
+                    results.append(result)
+                    continue
+                result["status"] = "done"
+                result["seconds"] = seconds
+                result["calls"] = {
+                    name: calls // len(forbidden_sets) for name, calls in counts.items()
+                }
+                if memory:  # a separate run, tracemalloc slows everything down
+                    tracemalloc.start()
+                    try:
+                        with make_engine(
+                            engine, recipe_list, compiled_file, reference_limit * 10
+                        ) as answer:
+                            time_query(answer, query, forbidden_sets)
+                        peak = tracemalloc.get_traced_memory()[1]
+                        result["peak_memory_mb"] = peak / 2**20
+                    except ReferenceTimeout:
+                        result["peak_memory_mb"] = None
+                    finally:
+                        tracemalloc.stop()
+                results.append(result)
+    return results
+
+
+def run_benchmark(
+    depths, branchings, alternatives, forbidden_sizes, width=10, seed=0, **options
+):
+    """
+    benchmarks every combination of the settings, returns the json report.
+    once the recursive engine times out on a query it isn't tried again at
+    greater depths with the same other settings
+    """
+    report = []
+    gave_up = set()  # (branching, alternatives, forbidden, query)
+    for depth in depths:
+        for branching in branchings:
+            for alternative_count in alternatives:
+                recipe_list, names = generate_recipes(
+                    depth, branching, alternative_count, width, seed
+                )
+                for forbidden_size in forbidden_sizes:
+                    case = {
+                        "depth": depth,
+                        "branching": branching,
+                        "alternatives": alternative_count,
+                        "forbidden": forbidden_size,
+                        "recipes": len(recipe_list),
+                    }
+                    settings = branching, alternative_count, forbidden_size
+                    skip = {query for query in QUERIES if (*settings, query) in gave_up}
+                    for result in benchmark_case(
+                        recipe_list,
+                        names,
+                        forbidden_size,
+                        skip_reference=skip,
+                        **options,
+                    ):
+                        report.append(dict(case, **result))
+                        if result["status"] == "timeout":
+                            gave_up.add((*settings, result["query"]))
+                        print(
+                            f"depth {depth} branching {branching} alternatives "
+                            f"{alternative_count} forbidden {forbidden_size} "
+                            f"{result['engine']} {result['query']}: "
+                            f"{result['status']} {result.get('seconds', 0):.4f}s",
+                            file=sys.stderr,
+                        )
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depths", type=int, nargs="+", default=[2, 4, 6, 8])
+    parser.add_argument("--branching", type=int, nargs="+", default=[2, 3])
+    parser.add_argument("--alternatives", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--forbidden", type=int, nargs="+", default=[0, 5])
+    parser.add_argument("--width", type=int, default=10, help="items per layer")
+    parser.add_argument("--max-flat", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument(
+        "--reference-limit",
+        type=float,
+        default=10,
+        help="seconds the recursive engine gets for each query",
+    )
+    parser.add_argument("--output", help="write the json report to this file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        args.depths,
+        args.branching,
+        args.alternatives,
+        args.forbidden,
+        args.width,
+        args.seed,
+        max_flat=args.max_flat,
+        memory=not args.no_memory,
+        reference_limit=args.reference_limit,
+    )
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,12 @@ implementation of the game 'Sokoban'
 """
 
 import json
+import time
+import functools
+import heapq
+import pickle
 import typing
+from collections import deque, OrderedDict
 
 
 direction_vector = {
@@ -29,19 +34,50 @@ def new_game(level_description):
         [['target', 'player'], ['computer'], ['target']],
     ]
 
-    Turns into dictionary where the keys are the tuples representing the positon
-    and the value is what is in that position. Also has extra 'dimension' key
+    Turns into dictionary that keeps the parts of the level that never move
+    ('dimension', 'walls' and 'targets') separate from the parts that do
+    ('player' position and frozenset of 'computers' positions). Steps share
+    the unchanging parts, so copying and hashing a game only costs as much as
+    the number of computers.
     """
-    level = {}
+    walls = set()
+    targets = set()
+    computers = set()
+    player = None
     for row_i, row in enumerate(
         level_description
-    ):  # find all the coordinates and create key with object
+    ):  # find all the coordinates of each object
         for col_i, col in enumerate(row):
-            level[(row_i, col_i)] = frozenset(col)
+            if "wall" in col:
+                walls.add((row_i, col_i))
+            if "target" in col:
+                targets.add((row_i, col_i))
+            if "computer" in col:
+                computers.add((row_i, col_i))
+            if "player" in col:
+                player = (row_i, col_i)
     num_rows = len(level_description)
     num_cols = len(level_description[0])
-    level["dimension"] = (num_rows, num_cols)  # add dimension key
-    return level
+    for row_i in range(-1, num_rows + 1):  # invisible walls around the board
+        walls.add((row_i, -1))
+        walls.add((row_i, num_cols))
+    for col_i in range(num_cols):
+        walls.add((-1, col_i))
+        walls.add((num_rows, col_i))
+    return {
+        "dimension": (num_rows, num_cols),
+        "walls": frozenset(walls),
+        "targets": frozenset(targets),
+        "player": player,
+        "computers": frozenset(computers),
+    }
+
+
+def game_state(game):
+    """
+    returns the hashable part of the game that changes between steps
+    """
+    return (game["player"], game["computers"])
 
 
 def victory_check(game):
@@ -50,15 +86,9 @@ def victory_check(game):
     a Boolean: True if the given game satisfies the victory condition, and
     False otherwise.
     """
-    num_targets = 0
-    for position in game:
-        if "target" in game[position]:
-            num_targets += 1
-            if "computer" not in game[position]:
-                return False
-    if not num_targets:  # checks if no targets
+    if not game["targets"]:  # checks if no targets
         return False
-    return True
+    return game["targets"] <= game["computers"]
 
 
 def get_new_position(coordinate, direction):
@@ -80,23 +110,20 @@ def step_game(game, direction):
     This function should not mutate its input.
     """
     level = game.copy()
-    for position in level:
-        if "player" in level[position]:
-            player = position
+    player = game["player"]
+    computers = game["computers"]
     new_player = get_new_position(player, direction)  # find new position given input
-    if "wall" in level[new_player]:  # does nothing if wall
+    if new_player in game["walls"]:  # does nothing if wall
         return level
-    if "computer" in level[new_player]:  # checks if computer in place
+    if new_player in computers:  # checks if computer in place
         new_position = get_new_position(new_player, direction)
         if (
-            "wall" in level[new_position] or "computer" in level[new_position]
+            new_position in game["walls"] or new_position in computers
         ):  # does nothing if computer next to wall or computer
             return level
-        else:
-            level[new_player] = level[new_player] - {"computer"}  # moves computer
-            level[new_position] = level[new_position].union({"computer"})
-    level[player] = level[player] - {'player'}
-    level[new_player] = level[new_player].union({"player"})
+        computers = computers.difference({new_player}).union({new_position})
+        level["computers"] = computers  # moves computer
+    level["player"] = new_player
     return level
 
 
@@ -111,19 +138,64 @@ def dump_game(game):
     print out the current state of your game for testing and debugging on your
     own.
     """
-    level_description = []
-    new_row = []
     num_row, num_col = game[
         "dimension"
     ]  # turns coordinates into rows and cols using dimesion
-    for row in range(num_row):
-        for col in range(num_col):
-            new_row.append(list(game[(row, col)]))
-        level_description.append(new_row.copy())
-        new_row = []
+    level_description = [[[] for _ in range(num_col)] for _ in range(num_row)]
+    for name, positions in (
+        ("wall", game["walls"]),
+        ("target", game["targets"]),
+        ("computer", game["computers"]),
+        ("player", (game["player"],)),
+    ):
+        for row, col in positions:
+            if 0 <= row < num_row and 0 <= col < num_col:
+                level_description[row][col].append(name)
     return level_description
 
 
+def cell_contents(game, position):
+    """
+    returns the list of objects at position, in the same form as one cell of
+    the level description from dump_game
+    """
+    contents = []
+    if position in game["walls"]:
+        contents.append("wall")
+    if position in game["targets"]:
+        contents.append("target")
+    if position in game["computers"]:
+        contents.append("computer")
+    if position == game["player"]:
+        contents.append("player")
+    return contents
+
+
+def diff_games(game1, game2):
+    """
+    returns a dictionary mapping each (row, col) whose contents are different
+    in game2 than in game1 to its new contents. only the player and computers
+    move, so this costs as much as the number of computers that moved rather
+    than the size of the board
+    """
+    changed = set(game1["computers"].symmetric_difference(game2["computers"]))
+    if game1["player"] != game2["player"]:
+        changed.add(game1["player"])
+        changed.add(game2["player"])
+    return {position: cell_contents(game2, position) for position in changed}
+
+
+def replay(game, moves):
+    """
+    generator that plays moves from game, yielding (move, new game, diff) for
+    every move, where diff is the dictionary of changed cells from diff_games
+    """
+    for move in moves:
+        next_game = step_game(game, move)
+        yield move, next_game, diff_games(game, next_game)
+        game = next_game
+
+
 def make_unhashable(game):
     """
     turns game into an unhashable form to store in a set
@@ -139,7 +211,661 @@ def make_unhashable(game):
     # return tuple(new_level)
 
 
-def solve_puzzle(game):
+def next_state(game, state, direction):
+    """
+    moves the player of state (as returned by game_state) one step in direction
+    returns the new state and the change in the number of computers on
+    targets, or None if the player can't move that way
+    """
+    player, computers = state
+    new_player = get_new_position(player, direction)
+    if new_player in game["walls"]:
+        return None
+    if new_player not in computers:
+        return (new_player, computers), 0
+    new_position = get_new_position(new_player, direction)
+    if new_position in game["walls"] or new_position in computers:
+        return None
+    targets = game["targets"]
+    change = (new_position in targets) - (new_player in targets)
+    computers = computers.difference({new_player}).union({new_position})
+    return (new_player, computers), change
+
+
+def rebuild_moves(parents, state):
+    """
+    follows the parent pointers from state back to the start
+    returns list of moves from the start to state
+    """
+    moves = []
+    while parents[state] is not None:
+        state, direction = parents[state]
+        moves.append(direction)
+    moves.reverse()
+    return moves
+
+
+def dead_squares(game):
+    """
+    returns the set of floor cells from which a computer can never be pushed
+    onto any target, even if there were no other computers in the way
+    """
+    walls = game["walls"]
+    num_rows, num_cols = game["dimension"]
+    live = set(game["targets"])
+    agenda = list(live)
+    while agenda:  # pulls computers backwards away from every target
+        row, col = agenda.pop()
+        for d_row, d_col in direction_vector.values():
+            computer = (row - d_row, col - d_col)
+            player = (row - 2 * d_row, col - 2 * d_col)
+            if computer not in live and computer not in walls and player not in walls:
+                live.add(computer)
+                agenda.append(computer)
+    return {
+        (row, col)
+        for row in range(num_rows)
+        for col in range(num_cols)
+        if (row, col) not in walls and (row, col) not in live
+    }
+
+
+def frozen(game, computers, position, dead, treat_as_walls=frozenset()):
+    """
+    checks if the computer at position can never be moved again, because on
+    both axes it is stuck against walls, dead squares or other frozen computers
+    """
+    walls = game["walls"]
+    treat_as_walls = treat_as_walls | {position}  # stops checks going in circles
+    for d_row, d_col in ((0, 1), (1, 0)):
+        side1 = (position[0] - d_row, position[1] - d_col)
+        side2 = (position[0] + d_row, position[1] + d_col)
+        if side1 in walls or side2 in walls:
+            continue
+        if side1 in treat_as_walls or side2 in treat_as_walls:
+            continue
+        if side1 in dead and side2 in dead:  # any push along this axis is dead
+            continue
+        if any(
+            side in computers and frozen(game, computers, side, dead, treat_as_walls)
+            for side in (side1, side2)
+        ):
+            continue
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=16)
+def floor_neighbors(walls, dimension):
+    """
+    returns a dictionary mapping every floor cell to a tuple of the floor
+    cells next to it
+    """
+    num_rows, num_cols = dimension
+    neighbors = {}
+    for row in range(num_rows):
+        for col in range(num_cols):
+            if (row, col) not in walls:
+                neighbors[row, col] = tuple(
+                    (row + d_row, col + d_col)
+                    for d_row, d_col in direction_vector.values()
+                    if (row + d_row, col + d_col) not in walls
+                )
+    return neighbors
+
+
+@functools.lru_cache(maxsize=16)
+def floor_pushes(walls, dimension):
+    """
+    returns a dictionary mapping every floor cell to a tuple of (direction,
+    cell the player pushes from, cell the computer ends up in) for every way
+    a computer there could be pushed without hitting a wall
+    """
+    pushes = {}
+    for row, col in floor_neighbors(walls, dimension):
+        pushes[row, col] = tuple(
+            (direction, (row - d_row, col - d_col), (row + d_row, col + d_col))
+            for direction, (d_row, d_col) in direction_vector.items()
+            if (row - d_row, col - d_col) not in walls
+            and (row + d_row, col + d_col) not in walls
+        )
+    return pushes
+
+
+def player_region(game, player, computers):
+    """
+    returns the set of cells the player can walk to without pushing anything
+    """
+    neighbors = floor_neighbors(game["walls"], game["dimension"])
+    region = {player}
+    agenda = [player]
+    while agenda:
+        for neighbor in neighbors[agenda.pop()]:
+            if neighbor not in region and neighbor not in computers:
+                region.add(neighbor)
+                agenda.append(neighbor)
+    return region
+
+
+CORRAL_SEARCH_LIMIT = 16  # push level states
+CORRAL_MAX_FENCE = 4  # computers, bigger corrals are not checked
+
+
+def corral_deadlocked(game, state, pushed, dead, cache, region=None):
+    """
+    checks for a corral deadlock: the computers around the cells the player
+    can't reach have to get onto targets eventually, so if even with every
+    other computer removed that can't be done, the state can't be solved.
+    only corrals that the computer just pushed onto pushed is part of and
+    that have at most CORRAL_MAX_FENCE computers are checked, and the smaller
+    search gives up after CORRAL_SEARCH_LIMIT pushes
+    """
+    player, computers = state
+    if region is None:
+        region = player_region(game, player, computers)
+    neighbors = floor_neighbors(game["walls"], game["dimension"])
+
+    def fenced(computer):  # next to a floor cell the player can't reach
+        return any(
+            neighbor not in region and neighbor not in computers
+            for neighbor in neighbors[computer]
+        )
+
+    if not fenced(pushed):
+        return False
+    fence = {computer for computer in computers if fenced(computer)}
+    if len(fence) > CORRAL_MAX_FENCE:
+        return False
+    if len(fence) == len(computers) or fence <= game["targets"]:
+        return False
+    # without the other computers the player can reach the same cells from
+    # anywhere in region, so its top left cell stands for all of them
+    key = (frozenset(fence), min(region))
+    if key not in cache:
+        cache[key] = not _can_clear(game, player, frozenset(fence), dead)
+    return cache[key]
+
+
+def _can_clear(game, player, computers, dead, limit=CORRAL_SEARCH_LIMIT):
+    """
+    searches the pushes of computers (and nothing else) for a way to get all
+    of them onto targets. returns False only if there definitely is none,
+    gives up (returning True) after limit push level states
+    """
+    targets = game["targets"]
+    pushes = floor_pushes(game["walls"], game["dimension"])
+    region = player_region(game, player, computers)
+    visited = {(computers, min(region))}
+    agenda = deque([(computers, region)])
+    while agenda:
+        if len(visited) > limit:  # can't tell, assume possible
+            return True
+        computers, region = agenda.popleft()
+        for computer in computers:
+            for _, behind, ahead in pushes[computer]:
+                if behind not in region or ahead in computers or ahead in dead:
+                    continue
+                new_computers = computers.difference({computer}).union({ahead})
+                if new_computers <= targets:
+                    return True
+                new_region = player_region(game, computer, new_computers)
+                node = (new_computers, min(new_region))
+                if node not in visited:
+                    visited.add(node)
+                    agenda.append((new_computers, new_region))
+    return False
+
+
+def deadlocked(game, state, direction, dead, cache, region=None):
+    """
+    checks if the computer just pushed in direction (ending in state) leaves a
+    position that can never be solved. region is the player's reachable
+    region in state, if the caller already knows it
+    """
+    player, computers = state
+    pushed = get_new_position(player, direction)
+    if pushed in dead:
+        return True
+    if pushed not in game["targets"] and frozen(game, computers, pushed, dead):
+        return True
+    return corral_deadlocked(game, state, pushed, dead, cache, region)
+
+
+def push_distances(game):
+    """
+    returns a dictionary mapping each target to a dictionary of the fewest
+    pushes needed to get a computer from each cell onto that target, if there
+    were no other computers in the way
+    """
+    walls = game["walls"]
+    distances = {}
+    for target in game["targets"]:
+        distance = {target: 0}
+        agenda = deque([target])
+        while agenda:  # pulls a computer backwards away from the target
+            row, col = agenda.popleft()
+            for d_row, d_col in direction_vector.values():
+                computer = (row - d_row, col - d_col)
+                player = (row - 2 * d_row, col - 2 * d_col)
+                if (
+                    computer not in distance
+                    and computer not in walls
+                    and player not in walls
+                ):
+                    distance[computer] = distance[(row, col)] + 1
+                    agenda.append(computer)
+        distances[target] = distance
+    return distances
+
+
+UNREACHABLE = 10**9
+
+
+def min_cost_matching(costs):
+    """
+    input: list of n rows of m costs (n <= m)
+    returns the smallest total cost of giving every row a different column
+    (hungarian algorithm)
+    """
+    num_rows = len(costs)
+    if not num_rows:
+        return 0
+    num_cols = len(costs[0])
+    row_potential = [0] * (num_rows + 1)
+    col_potential = [0] * (num_cols + 1)
+    matched_row = [0] * (num_cols + 1)  # column -> row matched to it (1 based)
+    way = [0] * (num_cols + 1)
+    for row in range(1, num_rows + 1):
+        matched_row[0] = row
+        col = 0
+        smallest = [float("inf")] * (num_cols + 1)
+        used = [False] * (num_cols + 1)
+        while matched_row[col]:
+            used[col] = True
+            current_row = matched_row[col]
+            delta = float("inf")
+            next_col = 0
+            for other in range(1, num_cols + 1):
+                if not used[other]:
+                    reduced = (
+                        costs[current_row - 1][other - 1]
+                        - row_potential[current_row]
+                        - col_potential[other]
+                    )
+                    if reduced < smallest[other]:
+                        smallest[other] = reduced
+                        way[other] = col
+                    if smallest[other] < delta:
+                        delta = smallest[other]
+                        next_col = other
+            for other in range(num_cols + 1):
+                if used[other]:
+                    row_potential[matched_row[other]] += delta
+                    col_potential[other] -= delta
+                else:
+                    smallest[other] -= delta
+            col = next_col
+        while col:  # flips the augmenting path
+            previous = way[col]
+            matched_row[col] = matched_row[previous]
+            col = previous
+    return sum(
+        costs[matched_row[col] - 1][col - 1]
+        for col in range(1, num_cols + 1)
+        if matched_row[col]
+    )
+
+
+def push_heuristic(distances, computers, cache):
+    """
+    returns a lower bound on the moves left: every target needs its own
+    computer pushed onto it, and every push is a move. returns None if some
+    target can't get a computer at all
+    """
+    if computers not in cache:
+        costs = [
+            [distance.get(computer, UNREACHABLE) for computer in computers]
+            for distance in distances.values()
+        ]
+        total = min_cost_matching(costs)
+        cache[computers] = None if total >= UNREACHABLE else total
+    return cache[computers]
+
+
+def _solve_bfs(game, start, on_targets, dead, stats):
+    targets = game["targets"]
+    corral_cache = {}
+    parents = {start: None}  # every visited state -> (previous state, move)
+    agenda = deque([(start, on_targets)])
+    while agenda:  # continues until every reachable state is visited
+        stats["peak_frontier"] = max(stats["peak_frontier"], len(agenda))
+        state, on_targets = agenda.popleft()
+        stats["nodes_expanded"] += 1
+        for direction in direction_vector:  # checks each next move from state
+            result = next_state(game, state, direction)
+            if result is None:
+                continue
+            new_state, change = result
+            if new_state in parents:  # checks if in visited
+                continue
+            parents[new_state] = (state, direction)
+            if on_targets + change == len(targets):  # checks if win
+                return rebuild_moves(parents, new_state)
+            if (
+                dead is not None
+                and new_state[1] is not state[1]  # only pushes can deadlock
+                and deadlocked(game, new_state, direction, dead, corral_cache)
+            ):
+                continue
+            agenda.append((new_state, on_targets + change))
+    return None
+
+
+def _solve_astar(game, start, on_targets, dead, stats):
+    targets = game["targets"]
+    distances = push_distances(game)
+    heuristic_cache = {}
+    corral_cache = {}
+    estimate = push_heuristic(distances, start[1], heuristic_cache)
+    if estimate is None:
+        return None
+    parents = {start: None}
+    best = {start: 0}  # fewest moves found so far to each state
+    counter = 0  # breaks ties between equal entries in the heap
+    agenda = [(estimate, 0, counter, start, on_targets)]
+    while agenda:
+        stats["peak_frontier"] = max(stats["peak_frontier"], len(agenda))
+        _, negative_moves, _, state, on_targets = heapq.heappop(agenda)
+        moves = -negative_moves
+        if moves > best[state]:  # a shorter way here was already expanded
+            continue
+        if on_targets == len(targets):
+            return rebuild_moves(parents, state)
+        stats["nodes_expanded"] += 1
+        for direction in direction_vector:
+            result = next_state(game, state, direction)
+            if result is None:
+                continue
+            new_state, change = result
+            if moves + 1 >= best.get(new_state, float("inf")):
+                continue
+            pushed = new_state[1] is not state[1]
+            if pushed:
+                estimate = push_heuristic(distances, new_state[1], heuristic_cache)
+                if estimate is None:
+                    continue
+                if dead is not None and deadlocked(
+                    game, new_state, direction, dead, corral_cache
+                ):
+                    continue
+            else:
+                estimate = heuristic_cache[state[1]]
+            best[new_state] = moves + 1
+            parents[new_state] = (state, direction)
+            counter += 1
+            # ties go to the deeper state, which is closer to a solution
+            entry = (moves + 1 + estimate, -(moves + 1), counter, new_state)
+            heapq.heappush(agenda, entry + (on_targets + change,))
+    return None
+
+
+IDASTAR_TABLE_SIZE = 1_000_000  # states
+IDASTAR_CHECK_LIMIT = 200  # push level states
+
+
+def _solve_idastar(game, start, on_targets, dead, stats):
+    targets = game["targets"]
+    distances = push_distances(game)
+    heuristic_cache = {}
+    corral_cache = {}
+    bound = push_heuristic(distances, start[1], heuristic_cache)
+    if bound is None:
+        return None
+    # every iteration goes over every state it can reach again, so a small
+    # level that can't be solved is much quicker to rule out over pushes
+    if dead is not None and not _can_clear(
+        game, start[0], start[1], dead, IDASTAR_CHECK_LIMIT
+    ):
+        return None
+    while True:  # deepens the cost bound until a solution fits under it
+        next_bound = float("inf")
+        # fewest moves each state was reached with in this iteration: getting
+        # there again with as many moves can't find anything new under the
+        # same bound. once full, new states are only checked against the path
+        best = {start: 0}
+        on_path = {start}
+        path = []  # moves taken to reach the state on top of the stack
+        stack = [(start, on_targets, iter(direction_vector))]
+        while stack:
+            stats["peak_frontier"] = max(stats["peak_frontier"], len(stack))
+            state, on_targets, directions = stack[-1]
+            direction = next(directions, None)
+            if direction is None:  # every move from this state is done
+                stack.pop()
+                on_path.discard(state)
+                if path:
+                    path.pop()
+                continue
+            result = next_state(game, state, direction)
+            if result is None or result[0] in on_path:
+                continue
+            new_state, change = result
+            moves = len(path) + 1
+            if moves >= best.get(new_state, float("inf")):
+                continue
+            if new_state in best or len(best) < IDASTAR_TABLE_SIZE:
+                best[new_state] = moves
+            estimate = push_heuristic(distances, new_state[1], heuristic_cache)
+            if estimate is None:
+                continue
+            if new_state[1] is not state[1] and dead is not None:
+                if deadlocked(game, new_state, direction, dead, corral_cache):
+                    continue
+            cost = moves + estimate
+            if cost > bound:
+                next_bound = min(next_bound, cost)
+                continue
+            path.append(direction)
+            if on_targets + change == len(targets):
+                return path
+            stats["nodes_expanded"] += 1
+            on_path.add(new_state)
+            stack.append((new_state, on_targets + change, iter(direction_vector)))
+        if next_bound == float("inf"):
+            return None
+        bound = next_bound
+
+
+def walk_moves(game, start, goal, computers):
+    """
+    returns the shortest list of moves that walks the player from start to
+    goal without pushing anything, or None if goal can't be reached
+    """
+    walls = game["walls"]
+    parents = {start: None}
+    agenda = deque([start])
+    while agenda:
+        position = agenda.popleft()
+        if position == goal:
+            return rebuild_moves(parents, goal)
+        for direction in direction_vector:
+            neighbor = get_new_position(position, direction)
+            if (
+                neighbor not in parents
+                and neighbor not in walls
+                and neighbor not in computers
+            ):
+                parents[neighbor] = (position, direction)
+                agenda.append(neighbor)
+    return None
+
+
+def _solve_pushes(game, start, on_targets, dead, stats):
+    targets = game["targets"]
+    pushes = floor_pushes(game["walls"], game["dimension"])
+    corral_cache = {}
+    # a node is a computer layout plus one of the regions the player can be
+    # in with it, which stands for every player position in that region. the
+    # region is only worked out once a node is expanded, and then serves every
+    # push from it, so the agenda can hold the same node more than once
+    parents = {}  # node -> (previous node, where a computer was pushed to, move)
+    regions = {}  # computers -> regions of the nodes with them already seen
+    agenda = deque([(start[1], start[0], None)])
+    while agenda:
+        stats["peak_frontier"] = max(stats["peak_frontier"], len(agenda))
+        computers, player, link = agenda.popleft()
+        seen = regions.setdefault(computers, [])
+        if any(player in region for region in seen):
+            continue
+        region = player_region(game, player, computers)
+        node = (computers, len(seen))
+        seen.append(region)
+        parents[node] = link
+        if (
+            link is not None
+            and dead is not None
+            and corral_deadlocked(
+                game, (player, computers), link[1], dead, corral_cache, region
+            )
+        ):
+            continue  # stays in parents so it is never checked again
+        stats["nodes_expanded"] += 1
+        for computer in computers:
+            for direction, behind, ahead in pushes[computer]:
+                if behind not in region or ahead in computers:
+                    continue
+                if dead is not None and ahead in dead:
+                    continue
+                new_computers = computers.difference({computer}).union({ahead})
+                if any(computer in seen for seen in regions.get(new_computers, ())):
+                    continue
+                link = (node, ahead, direction)
+                if new_computers >= targets:
+                    goal = (new_computers, None)
+                    parents[goal] = link
+                    return _push_moves(game, parents, goal, start[0])
+                if (
+                    dead is not None
+                    and ahead not in targets
+                    and frozen(game, new_computers, ahead, dead)
+                ):
+                    continue  # needs no region, so is checked before queueing
+                agenda.append((new_computers, computer, link))
+    return None
+
+
+def _push_moves(game, parents, node, player):
+    """
+    turns the chain of pushes ending in node back into every single move,
+    walking the player to the right side of each computer before pushing it
+    """
+    pushes = []
+    while parents[node] is not None:
+        node, pushed, direction = parents[node]
+        d_row, d_col = direction_vector[direction]
+        computer = (pushed[0] - d_row, pushed[1] - d_col)
+        pushes.append((node[0], computer, direction))
+    pushes.reverse()
+    moves = []
+    for computers, computer, direction in pushes:
+        d_row, d_col = direction_vector[direction]
+        behind = (computer[0] - d_row, computer[1] - d_col)
+        moves.extend(walk_moves(game, player, behind, computers))
+        moves.append(direction)
+        player = computer
+    return moves
+
+
+SOLVERS = {
+    "bfs": _solve_bfs,
+    "astar": _solve_astar,
+    "idastar": _solve_idastar,
+    "push": _solve_pushes,
+}
+
+
+class TranspositionTable:
+    """
+    remembers, for states of levels that were solved before, how many moves
+    are left to win and the best next move. solving from any position along
+    a known solution (like when giving a hint) then needs no search at all.
+    only the maxsize most recently used states are kept
+    """
+
+    def __init__(self, maxsize=1_000_000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # (level, state) -> (moves left, move)
+
+    def _key(self, game, state):
+        return (game["dimension"], game["walls"], game["targets"], state)
+
+    def lookup(self, game, state=None):
+        """
+        returns (moves left, best move) for the state of game (or the given
+        state), (None, None) if it is known to be unsolvable, or None if the
+        state isn't in the table
+        """
+        key = self._key(game, game_state(game) if state is None else state)
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def store(self, game, state, moves_left, move):
+        key = self._key(game, state)
+        self.entries[key] = (moves_left, move)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)  # evicts least recently used
+
+    def record(self, game, solution):
+        """
+        stores every state along a shortest solution from game (or that the
+        game is unsolvable, if solution is None)
+        """
+        state = game_state(game)
+        if solution is None:
+            self.store(game, state, None, None)
+            return
+        for index, move in enumerate(solution):
+            self.store(game, state, len(solution) - index, move)
+            state = next_state(game, state, move)[0]
+        self.store(game, state, 0, None)
+
+    def solution(self, game):
+        """
+        follows the stored best moves from game to a win
+        returns (True, moves or None if unsolvable) if the table knows the
+        answer, or (False, None) if it doesn't
+        """
+        state = game_state(game)
+        moves = []
+        while True:
+            entry = self.lookup(game, state)
+            if entry is None:  # evicted or never seen
+                return False, None
+            moves_left, move = entry
+            if moves_left is None:
+                return True, None
+            if moves_left == 0:
+                return True, moves
+            moves.append(move)
+            state = next_state(game, state, move)[0]
+
+    def save(self, filename):
+        with open(filename, "wb") as f:
+            pickle.dump((self.maxsize, list(self.entries.items())), f)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, "rb") as f:
+            maxsize, entries = pickle.load(f)
+        table = cls(maxsize)
+        table.entries.update(entries)
+        return table
+
+
+def solve_puzzle(game, mode="bfs", stats=None, table=None):
     """
     Given a game representation (of the form returned from new game), find a
     solution.
@@ -148,27 +874,53 @@ def solve_puzzle(game):
     "down", "left", and "right") needed to reach the victory condition.
 
     If the given level cannot be solved, return None.
+
+    mode picks the search: "bfs" (breadth first), "astar" (A* guided by the
+    push distances of a best matching of computers to targets) or "idastar"
+    (iterative deepening A*, which keeps the current path and a table of at
+    most IDASTAR_TABLE_SIZE states in memory).
+    every one of those returns a shortest solution. "push" searches over
+    pushes only, treating every spot the player can walk to between pushes as
+    the same state, which is much faster on open levels but returns a solution
+    with the fewest pushes rather than the fewest moves. if stats is a
+    dictionary it is filled with the nodes expanded, peak frontier size and
+    time taken. if table is a TranspositionTable, states it already knows are
+    answered from it, and new shortest solutions are added to it
     """
-    if victory_check(game):  # checks if game is initially solved
-        return []
-    visited = set()
-    visited.add(tuple(game.items()))  # create visited set and adds starting level
-    possible_paths = [[game]]  # list of possible paths
-    while possible_paths:  # continues until possible paths is empty
-        path = possible_paths.pop(0)
-        for direction in [
-            "up",
-            "down",
-            "left",
-            "right",
-        ]:  # checks each next move from path
-            previous_game = path[0] # finds info of previous game
-            new_path = path + [direction]
-            next_game = step_game(previous_game, direction)  # creates new situation
-            if tuple(next_game.items()) not in visited:  # checks if in visited
-                if victory_check(next_game):  # checks if win, returns if true
-                    return new_path[1:]
-                visited.add(tuple(next_game.items()))  # adds to visited
-                new_path[0] = next_game
-                possible_paths.append(new_path)
-    return None
+    if mode not in SOLVERS:
+        raise ValueError(f"unknown solver mode {mode!r}")
+    if stats is None:
+        stats = {}
+    stats.update(nodes_expanded=0, peak_frontier=0, seconds=0.0)
+    started = time.perf_counter()
+    use_table = table is not None and mode != "push"  # push isn't move optimal
+    if use_table:
+        known, solution = table.solution(game)
+        if known:
+            stats["seconds"] = time.perf_counter() - started
+            return solution
+    targets = game["targets"]
+    start = game_state(game)
+    if not targets or len(start[1]) < len(targets):
+        solution = None  # not enough computers to ever cover every target
+    elif len(targets & start[1]) == len(targets):
+        solution = []  # checks if game is initially solved
+    else:
+        # with spare computers one can be left anywhere, so nothing is a
+        # deadlock and no squares are dead
+        dead = dead_squares(game) if len(start[1]) == len(targets) else None
+        on_targets = len(targets & start[1])
+        solution = SOLVERS[mode](game, start, on_targets, dead, stats)
+    if use_table:
+        table.record(game, solution)
+    stats["seconds"] = time.perf_counter() - started
+    return solution
+
+
+def hint(game, table, mode="astar"):
+    """
+    returns the best next move from game (None if there is none), using and
+    filling table so that following hints never searches twice
+    """
+    solution = solve_puzzle(game, mode, table=table)
+    return solution[0] if solution else None
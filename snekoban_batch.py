@@ -0,0 +1,262 @@
+"""
+solves whole collections of snekoban level files at once
+levels are solved in parallel worker processes with a time and memory limit for
+each one, and solutions are saved to a results file that later runs reuse
+for any level whose contents haven't changed
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import signal
+import hashlib
+import argparse
+import multiprocessing
+import multiprocessing.connection
+
+try:
+    import resource
+except ImportError:  # not available on windows, memory limits are skipped
+    resource = None
+
+import snekoban
+
+
+class LevelTimeout(Exception):
+    """
+    raised inside a worker when a level runs out of time
+    """
+
+
+def level_hash(level_description, mode):
+    """
+    returns a hash of the level contents and solver mode, used as the key of
+    the results file
+    """
+    contents = json.dumps([mode, level_description], sort_keys=True)
+    return hashlib.sha256(contents.encode("utf-8")).hexdigest()
+
+
+def find_levels(paths, exclude=()):
+    """
+    returns sorted list of every .json level file in paths (files or folders),
+    leaving out the files in exclude (like the results file)
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            pattern = os.path.join(path, "**", "*.json")
+            files.update(glob.glob(pattern, recursive=True))
+        else:
+            files.add(path)
+    excluded = {os.path.realpath(path) for path in exclude if path is not None}
+    return sorted(path for path in files if os.path.realpath(path) not in excluded)
+
+
+def _on_alarm(signum, frame):
+    raise LevelTimeout
+
+
+def _init_worker(memory_limit_mb):
+    """
+    caps the memory of a worker process
+    """
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 2**20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def solve_level(task):
+    """
+    input: (filename, level description, mode, time limit in seconds)
+    solves one level inside a worker, returns its result dictionary
+    """
+    filename, level_description, mode, time_limit = task
+    result = {"file": filename, "mode": mode}
+    stats = {}
+    started = time.perf_counter()
+    if time_limit:
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        game = snekoban.new_game(level_description)
+        moves = snekoban.solve_puzzle(game, mode, stats)
+    except LevelTimeout:
+        result["status"] = "timeout"
+    except MemoryError:
+        result["status"] = "memory"
+    except Exception as error:  # not a level, one bad file can't stop the run
+        result["status"] = "error"
+        result["error"] = repr(error)
+    else:
+        result["status"] = "unsolvable" if moves is None else "solved"
+        result["moves"] = moves
+    finally:
+        if time_limit:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    result.update(stats)
+    result["seconds"] = time.perf_counter() - started  # also counts timeouts
+    result["nodes_per_second"] = result.get("nodes_expanded", 0) / result["seconds"]
+    return result
+
+
+def _run_level(connection, task, memory_limit_mb):
+    _init_worker(memory_limit_mb)
+    connection.send(solve_level(task))
+    connection.close()
+
+
+def solve_in_workers(tasks, processes=None, memory_limit_mb=None):
+    """
+    yields the result of every solve_level task as it finishes, running up to
+    processes levels at once. every level gets a fresh worker process, so a
+    level that hit its memory limit can't leave a worker in a bad state for
+    the next one, and a worker killed outright (say by the os running out of
+    memory) only loses its own level, which gets an "error" result
+    """
+    processes = processes or os.cpu_count() or 1
+    waiting = list(reversed(tasks))
+    running = {}  # connection -> (worker, task)
+    while waiting or running:
+        while waiting and len(running) < processes:
+            task = waiting.pop()
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            worker = multiprocessing.Process(
+                target=_run_level, args=(sender, task, memory_limit_mb), daemon=True
+            )
+            worker.start()
+            sender.close()  # so receiving fails once the worker is gone
+            running[receiver] = worker, task
+        for receiver in multiprocessing.connection.wait(list(running)):
+            worker, task = running.pop(receiver)
+            try:
+                result = receiver.recv()
+            except EOFError:
+                worker.join()  # for its exit code
+                filename, _, mode, _ = task
+                result = {
+                    "file": filename,
+                    "mode": mode,
+                    "status": "error",
+                    "error": f"worker died with exit code {worker.exitcode}",
+                }
+            receiver.close()
+            worker.join()
+            yield result
+
+
+def load_results(filename):
+    """
+    returns the saved results (level hash -> result), or {} if there are none
+    """
+    if filename is None or not os.path.exists(filename):
+        return {}
+    with open(filename, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(filename, saved):
+    """
+    writes the results file in one step, so an interrupted run leaves the
+    previous version (rather than half a file) behind
+    """
+    with open(filename + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(saved, f, indent=1)
+    os.replace(filename + ".tmp", filename)
+
+
+def solve_levels(
+    paths,
+    mode="bfs",
+    processes=None,
+    time_limit=60,
+    memory_limit_mb=None,
+    results_file=None,
+):
+    """
+    solves every level file in paths and returns a dictionary of counts and
+    the list of per level results. results are read from and saved to
+    results_file (after every level, so finished levels survive a crash);
+    levels with a saved solved or unsolvable result are skipped
+    """
+    saved = load_results(results_file)
+    results = []
+    tasks = []
+    hashes = {}
+    for filename in find_levels(paths, exclude=[results_file]):
+        try:
+            with open(filename, encoding="utf-8") as f:
+                level_description = json.load(f)
+        except (OSError, ValueError) as error:
+            error = repr(error)
+            results.append(
+                {"file": filename, "mode": mode, "status": "error", "error": error}
+            )
+            continue
+        key = level_hash(level_description, mode)
+        hashes[filename] = key
+        if saved.get(key, {}).get("status") in ("solved", "unsolvable"):
+            results.append(dict(saved[key], file=filename, cached=True))
+        else:
+            tasks.append((filename, level_description, mode, time_limit))
+
+    for result in solve_in_workers(tasks, processes, memory_limit_mb):
+        results.append(result)
+        saved[hashes[result["file"]]] = result
+        if results_file is not None:
+            save_results(results_file, saved)
+
+    results.sort(key=lambda result: result["file"])
+    counts = {"solved": 0, "unsolvable": 0, "timeout": 0, "memory": 0, "error": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    fresh = [result for result in results if not result.get("cached")]
+    nodes = sum(result.get("nodes_expanded", 0) for result in fresh)
+    seconds = sum(result.get("seconds", 0) for result in fresh)
+    return {
+        "counts": counts,
+        "cached": sum(1 for result in results if result.get("cached")),
+        "nodes_per_second": nodes / seconds if seconds else None,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="+", help="level files or folders of them")
+    parser.add_argument("--mode", default="bfs", choices=sorted(snekoban.SOLVERS))
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=60, help="seconds each")
+    parser.add_argument("--memory-limit", type=int, default=None, help="MB each")
+    parser.add_argument("--results", default="snekoban_results.json")
+    args = parser.parse_args(argv)
+
+    summary = solve_levels(
+        args.paths,
+        args.mode,
+        args.processes,
+        args.time_limit,
+        args.memory_limit,
+        args.results,
+    )
+    for result in summary["results"]:
+        if result["status"] == "error":
+            print(f"{result['file']}: error ({result['error']})")
+            continue
+        length = len(result["moves"]) if result.get("moves") is not None else "-"
+        print(f"{result['file']}: {result['status']} ({length} moves)")
+    counts = summary["counts"]
+    print(
+        f"solved {counts['solved']}, unsolvable {counts['unsolvable']}, "
+        f"timeout {counts['timeout']}, out of memory {counts['memory']}, "
+        f"errors {counts['error']}, reused {summary['cached']}",
+        file=sys.stderr,
+    )
+    if summary["nodes_per_second"] is not None:
+        print(f"{summary['nodes_per_second']:.0f} nodes/second", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+benchmarks for the snekoban solver
+runs every solver mode on hand written and generated levels of increasing
+difficulty and records states expanded, states per second, peak memory,
+solution length and (optionally) where the time goes inside the search
+"""
+
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+import tracemalloc
+from contextlib import contextmanager
+
+import snekoban
+from snekoban_batch import LevelTimeout
+
+# levels in the usual text format: # wall, @ player, $ computer, . target,
+# * computer on a target, + player on a target
+HAND_WRITTEN = {
+    "corridor": """
+#######
+#@ $ .#
+#######
+""",
+    "two_rooms": """
+#########
+#   #   #
+# $   $.#
+#@  #  .#
+#########
+""",
+    "square": """
+#######
+#.  ..#
+# $$  #
+#@ $$ #
+#.    #
+#######
+""",
+    "warehouse": """
+  #####
+###   #
+#.@$  #
+### $.#
+#.##$ #
+# # . ##
+#$ *$$.#
+#   .  #
+########
+""",
+}
+
+
+def parse_level(text):
+    """
+    turns a level in the text format into a level description for new_game
+    """
+    symbols = {
+        "#": ["wall"],
+        "@": ["player"],
+        "$": ["computer"],
+        ".": ["target"],
+        "*": ["computer", "target"],
+        "+": ["player", "target"],
+    }
+    rows = [line for line in text.split("\n") if line.strip()]
+    width = max(len(row) for row in rows)
+    return [
+        [list(symbols.get(char, [])) for char in row.ljust(width)] for row in rows
+    ]
+
+
+def generate_level(
+    rows, cols, num_computers, num_pulls, wall_density=0.1, seed=None
+):
+    """
+    makes a level that is guaranteed to be solvable by starting from the
+    solved position and pulling computers off their targets at random. more
+    pulls generally make a harder level
+    """
+    rng = random.Random(seed)
+    walls = set()
+    for row in range(rows):
+        for col in range(cols):
+            border = row in (0, rows - 1) or col in (0, cols - 1)
+            if border or rng.random() < wall_density:
+                walls.add((row, col))
+    floor = [
+        (row, col)
+        for row in range(rows)
+        for col in range(cols)
+        if (row, col) not in walls
+    ]
+    rng.shuffle(floor)
+    targets = set(floor[:num_computers])
+    computers = set(targets)
+    player = floor[num_computers]
+    steps = list(snekoban.direction_vector.values())
+    for _ in range(num_pulls):  # walks the player around, sometimes pulling
+        d_row, d_col = rng.choice(steps)
+        ahead = (player[0] + d_row, player[1] + d_col)
+        behind = (player[0] - d_row, player[1] - d_col)
+        if ahead in walls or ahead in computers:
+            continue
+        if behind in computers and rng.random() < 0.5:
+            computers.remove(behind)
+            computers.add(player)
+        player = ahead
+    level = [[[] for _ in range(cols)] for _ in range(rows)]
+    for name, positions in (
+        ("wall", walls),
+        ("target", targets),
+        ("computer", computers),
+        ("player", [player]),
+    ):
+        for row, col in positions:
+            level[row][col].append(name)
+    return level
+
+
+def benchmark_levels(seed=0):
+    """
+    returns list of (name, level description), easiest first
+    """
+    levels = [(name, parse_level(text)) for name, text in HAND_WRITTEN.items()]
+    for size, num_computers, num_pulls in (
+        (6, 1, 300),
+        (7, 2, 500),
+        (8, 2, 1000),
+        (9, 3, 300),
+        (10, 3, 1000),
+        (12, 4, 1000),
+    ):
+        level = generate_level(
+            size, size, num_computers, num_pulls, seed=f"{seed}:{size}"
+        )
+        levels.append((f"generated_{size}x{size}_{num_computers}", level))
+    return levels
+
+
+@contextmanager
+def profile_hooks(counts):
+    """
+    while active, the solver's step generation, state hashing, deadlock
+    checks, heuristic and player region fills are timed into counts
+    (name -> [calls, seconds]). the goal check needs no hook: the solvers
+    compare a running count of computers on targets instead of scanning
+    """
+    originals = {}
+
+    def timed(name, function):
+        entry = counts.setdefault(name, [0, 0.0])
+
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = function(*args, **kwargs)
+            entry[0] += 1
+            entry[1] += time.perf_counter() - started
+            return result
+
+        return wrapper
+
+    hashing = counts.setdefault("hashing", [0, 0.0])
+
+    def step_and_hash(function):
+        def wrapper(game, state, direction):
+            result = function(game, state, direction)
+            if result is not None:
+                # the computers' frozenset caches its hash, so hashing it here
+                # moves the cost out of the visited lookup that follows
+                started = time.perf_counter()
+                hash(result[0])
+                hashing[0] += 1
+                hashing[1] += time.perf_counter() - started
+            return result
+
+        return wrapper
+
+    hooks = {
+        "next_state": lambda f: step_and_hash(timed("step generation", f)),
+        "deadlocked": lambda f: timed("deadlock checks", f),
+        "push_heuristic": lambda f: timed("heuristic", f),
+        "player_region": lambda f: timed("player regions", f),
+    }
+    for name, hook in hooks.items():
+        originals[name] = getattr(snekoban, name)
+        setattr(snekoban, name, hook(originals[name]))
+    try:
+        yield counts
+    finally:
+        for name, function in originals.items():
+            setattr(snekoban, name, function)
+
+
+def _on_alarm(signum, frame):
+    raise LevelTimeout
+
+
+def run_solver(level, mode, time_limit):
+    """
+    solves level once, returns (solution, stats) or raises LevelTimeout
+    """
+    stats = {}
+    if time_limit:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        solution = snekoban.solve_puzzle(snekoban.new_game(level), mode, stats)
+    finally:
+        if time_limit:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return solution, stats
+
+
+def benchmark_level(name, level, mode, time_limit=30, memory=True, profile=False):
+    """
+    benchmarks one level with one solver mode, returns a result dictionary
+    """
+    result = {"level": name, "mode": mode}
+    try:
+        solution, stats = run_solver(level, mode, time_limit)
+    except LevelTimeout:
+        result["status"] = "timeout"
+        return result
+    result["status"] = "unsolvable" if solution is None else "solved"
+    result["solution_length"] = None if solution is None else len(solution)
+    result.update(stats)
+    if stats["seconds"]:
+        result["states_per_second"] = stats["nodes_expanded"] / stats["seconds"]
+    if memory:  # a separate run, tracemalloc slows the search down a lot
+        tracemalloc.start()
+        try:
+            run_solver(level, mode, time_limit * 10)
+            result["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        except LevelTimeout:
+            result["peak_memory_mb"] = None
+        finally:
+            tracemalloc.stop()
+    if profile:
+        counts = {}
+        with profile_hooks(counts):
+            try:
+                run_solver(level, mode, time_limit * 10)
+            except LevelTimeout:
+                pass
+        result["profile"] = {
+            part: {"calls": calls, "seconds": seconds}
+            for part, (calls, seconds) in counts.items()
+        }
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--modes", nargs="+", default=sorted(snekoban.SOLVERS),
+        choices=sorted(snekoban.SOLVERS),
+    )
+    parser.add_argument("--levels", nargs="*", help="only run levels with these names")
+    parser.add_argument("--time-limit", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--output", help="write the json report to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, level in benchmark_levels(args.seed):
+        if args.levels and name not in args.levels:
+            continue
+        for mode in args.modes:
+            result = benchmark_level(
+                name, level, mode, args.time_limit, not args.no_memory, args.profile
+            )
+            results.append(result)
+            print(
+                f"{name} {mode}: {result['status']}"
+                f" length {result.get('solution_length')}"
+                f" expanded {result.get('nodes_expanded')}"
+                f" in {result.get('seconds', 0):.3f}s",
+                file=sys.stderr,
+            )
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
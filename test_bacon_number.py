@@ -0,0 +1,269 @@
+"""
+tests for bacon_number
+"""
+
+import os
+import random
+import pickle
+from collections import Counter
+
+import pytest
+
+import bacon_number
+
+CREDITS = [(1, 2, 10), (3, 4, 10), (1, 5, 11), (2, 6, 11)]
+
+
+def graph_state(graph):
+    return (
+        {
+            actor: [set(costars), set(films)]
+            for actor, (costars, films) in graph.items()
+        },
+        {actor: graph.bacon_number(actor) for actor in range(10)},
+        {actor: dict(costars) for actor, costars in graph._costars.items()},
+        {actor: dict(films) for actor, films in graph._films.items()},
+    )
+
+
+def test_remove_credits_never_added():
+    graph = bacon_number.ActorGraph(CREDITS, source=1)
+    before = graph_state(graph)
+    with pytest.raises(KeyError):
+        graph.remove_credits([(1, 4, 10)])  # both actors were in film 10
+    assert graph_state(graph) == before
+    assert 4 not in graph and 3 not in graph
+    assert graph[1][0] == {2, 5}
+
+
+def test_remove_credits_twice():
+    graph = bacon_number.ActorGraph(CREDITS, source=1)
+    graph.remove_credits([(2, 6, 11)])
+    after_first = graph_state(graph)
+    with pytest.raises(KeyError):
+        graph.remove_credits([(2, 6, 11)])
+    assert graph_state(graph) == after_first
+    with pytest.raises(KeyError):  # twice within one call
+        graph.remove_credits([(1, 5, 11), (1, 5, 11)])
+    assert graph_state(graph) == after_first
+
+
+def test_incremental_updates_match_rebuild():
+    credits = list(zip(range(0, 60, 3), range(1, 60, 2), range(40)))
+    credits += [(i, i + 1, 100 + i) for i in range(0, 30)]
+    graph = bacon_number.ActorGraph(source=0)
+    for start in range(0, len(credits), 7):
+        graph.add_credits(credits[start : start + 7])
+    graph.remove_credits(credits[::5])
+    kept = [credit for index, credit in enumerate(credits) if index % 5]
+    expected = bacon_number.transform_data(kept)
+    assert {actor: graph[actor] for actor in graph} == expected
+    fresh = bacon_number.ActorGraph(kept, source=0)
+    for actor in expected:
+        assert graph.bacon_number(actor) == fresh.bacon_number(actor)
+
+
+def random_graph(seed, num_actors=60, num_credits=90):
+    rng = random.Random(seed)
+    raw = [
+        (rng.randrange(num_actors), rng.randrange(num_actors), film)
+        for film in range(num_credits)
+    ]
+    return bacon_number.transform_data([(a, b, film) for a, b, film in raw if a != b])
+
+
+def check_path(graph, path, source, target):
+    assert path[0] == source and path[-1] == target
+    for actor1, actor2 in zip(path, path[1:]):
+        assert actor2 in graph[actor1][0]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_batch_paths_match_single_queries(processes):
+    graph = random_graph(processes)
+    actors = sorted(graph)
+    rng = random.Random(0)
+    queries = [(rng.choice(actors), rng.choice(actors)) for _ in range(200)]
+    queries += [(actors[0], 10**6)]  # not in the graph
+    paths = bacon_number.batch_paths(graph, queries, processes)
+    distances = bacon_number.batch_distances(graph, queries, processes)
+    for (source, target), path, distance in zip(queries, paths, distances):
+        expected = bacon_number.actor_to_actor_path(graph, source, target)
+        if expected is None:
+            assert path is None and distance is None
+            continue
+        check_path(graph, path, source, target)
+        assert len(path) == len(expected) == distance + 1
+
+
+def test_search_order_and_each_actor_tested_once():
+    graph = random_graph(3)
+    sources = set(sorted(graph)[:3])
+    tested = Counter()
+
+    def goal(actor):
+        tested[actor] += 1
+        return actor % 3 == 0
+
+    paths = list(bacon_number.actor_path_search(graph, sources, goal))
+    reached = bacon_number.flood_fill_parents(graph, sources)
+    assert set(tested) == set(reached)
+    assert set(tested.values()) == {1}
+    assert [path[-1] for path in paths] == [actor for actor in tested if goal(actor)]
+    lengths = [len(path) for path in paths]
+    assert lengths == sorted(lengths)
+    from_each = [bacon_number.flood_fill_parents(graph, {source}) for source in sources]
+    for path in paths:
+        assert path[0] in sources
+        check_path(graph, path, path[0], path[-1])
+        assert len(path) == min(
+            len(bacon_number.trace_path(parents, path[-1]))
+            for parents in from_each
+            if path[-1] in parents
+        )
+    first = bacon_number.actor_path(graph, sources, lambda actor: actor % 3 == 0)
+    assert first == paths[0]
+
+
+def test_search_limits():
+    graph = random_graph(4)
+    source = max(graph, key=lambda actor: len(graph[actor][0]))
+    everyone = list(bacon_number.actor_path_search(graph, source, lambda a: True))
+    assert len(everyone) > 10
+
+    tested = []
+    near = list(
+        bacon_number.actor_path_search(
+            graph, source, lambda actor: tested.append(actor) or True, max_depth=1
+        )
+    )
+    assert near == [path for path in everyone if len(path) <= 2]
+    assert len(tested) == len(near)
+
+    tested.clear()
+    first = list(
+        bacon_number.actor_path_search(
+            graph, source, lambda actor: tested.append(actor) or True, max_results=5
+        )
+    )
+    assert first == everyone[:5] and len(tested) == 5
+    assert bacon_number.nearest_actors(graph, source, lambda a: True, 0) == []
+    assert bacon_number.nearest_actors(graph, source, lambda a: True, 3) == everyone[:3]
+
+    # out of time before the first layer: only the start itself is tested
+    assert list(
+        bacon_number.actor_path_search(graph, source, lambda a: True, time_limit=0)
+    ) == [[source]]
+
+
+RAW = [(1, 2, 10), (2, 3, 11), (3, 4, 12), (2, 5, 10), (5, 6, 13), (7, 8, 14)]
+NAMES = {"Kevin": 1, "Ann": 2, "Bó": 3, "Zed": 4, "Eve": 5, "Sam": 6}
+MOVIES = {"First": 10, "Second": 11, "Third": 12, "Fourth": 13}
+
+
+def test_compiled_graph_round_trip(tmp_path):
+    expected = bacon_number.transform_data(RAW)
+    filename = tmp_path / "graph.graph"
+    bacon_number.compile_graph(expected, filename, NAMES, MOVIES)
+    with bacon_number.CompiledGraph(filename) as graph:
+        assert dict(graph) == expected
+        assert len(graph) == len(expected)
+        assert 7 not in graph and 1 in graph
+        with pytest.raises(KeyError):
+            graph[7]
+        for name, actor in NAMES.items():
+            assert graph.names.name(actor) == name
+            assert graph.names.id(name) == actor
+        for name, movie in MOVIES.items():
+            assert graph.movies.name(movie) == name
+            assert graph.movies.id(name) == movie
+        with pytest.raises(KeyError):
+            graph.names.id("Nobody")
+        with pytest.raises(KeyError):
+            graph.movies.name(99)
+        assert bacon_number.actor_path(graph, 1, lambda actor: actor == 6) == [
+            1,
+            2,
+            5,
+            6,
+        ]
+        copy = pickle.loads(pickle.dumps(graph))  # reopens the file
+        assert dict(copy) == expected
+        copy.close()
+
+
+def test_compiled_graph_without_names(tmp_path):
+    filename = tmp_path / "graph.graph"
+    bacon_number.compile_graph({}, filename)
+    with bacon_number.CompiledGraph(filename) as graph:
+        assert dict(graph) == {}
+        with pytest.raises(KeyError):
+            graph.names.id("Kevin")
+
+
+def test_compiled_graph_rejects_other_files(tmp_path):
+    filename = tmp_path / "raw.pickle"
+    filename.write_bytes(pickle.dumps(RAW))
+    with pytest.raises(ValueError):
+        bacon_number.CompiledGraph(filename)
+
+
+def test_open_graph_converts_once(tmp_path):
+    paths = {}
+    for name, contents in (("raw", RAW), ("names", NAMES), ("movies", MOVIES)):
+        paths[name] = tmp_path / f"{name}.pickle"
+        paths[name].write_bytes(pickle.dumps(contents))
+    with bacon_number.open_graph(
+        str(paths["raw"]), paths["names"], paths["movies"]
+    ) as graph:
+        assert dict(graph) == bacon_number.transform_data(RAW)
+        assert graph.names.id("Bó") == 3
+    compiled = tmp_path / "raw.graph"
+    converted = compiled.stat().st_mtime_ns
+    bacon_number.open_graph(str(paths["raw"])).close()
+    assert compiled.stat().st_mtime_ns == converted  # reused, not converted
+
+    # compiled without names first, then asked for them
+    compiled.unlink()
+    bacon_number.open_graph(str(paths["raw"])).close()
+    with bacon_number.open_graph(str(paths["raw"]), paths["names"]) as graph:
+        assert graph.names.id("Kevin") == 1
+        with pytest.raises(KeyError):
+            graph.movies.id("First")
+    with bacon_number.open_graph(
+        str(paths["raw"]), paths["names"], paths["movies"]
+    ) as graph:
+        assert graph.names.id("Kevin") == 1 and graph.movies.id("First") == 10
+    converted = compiled.stat().st_mtime_ns
+    bacon_number.open_graph(str(paths["raw"]), paths["names"]).close()
+    assert compiled.stat().st_mtime_ns == converted
+
+    os.utime(paths["raw"], ns=(converted + 10**9, converted + 10**9))
+    paths["raw"].write_bytes(pickle.dumps(RAW[:3] + [(3, 9, 15)]))
+    os.utime(paths["raw"], ns=(converted + 10**9, converted + 10**9))
+    with bacon_number.open_graph(str(paths["raw"])) as graph:
+        assert dict(graph) == bacon_number.transform_data(RAW[:3] + [(3, 9, 15)])
+
+
+def test_hub_update_only_touches_changed_actors(monkeypatch):
+    hub = 0
+    credits = [(hub, leaf, leaf) for leaf in range(1, 2001)]
+    credits += [(leaf, leaf + 1, 5000 + leaf) for leaf in range(1, 2000, 2)]
+    graph = bacon_number.ActorGraph(credits, source=hub)
+    before = {actor: graph[actor] for actor in graph}
+    checked = []
+    visible = bacon_number.ActorGraph._visible
+
+    def counted(self, actor):
+        checked.append(actor)
+        return visible(self, actor)
+
+    monkeypatch.setattr(bacon_number.ActorGraph, "_visible", counted)
+    graph.add_credits([(hub, 3000, 3000)])
+    graph.add_credits([(hub, 1, 9999)])  # a new film with an old co-star
+    graph.remove_credits([(hub, 3000, 3000)])
+    assert len(checked) <= 6
+    replaced = [actor for actor in before if graph[actor] is not before[actor]]
+    assert replaced == [hub, 1]
+    assert 3000 not in graph and graph.bacon_number(3000) is None
+    assert graph.bacon_number(1) == 1 and graph.bacon_number(2) == 1
@@ -0,0 +1,120 @@
+"""
+tests for bacon_server, run against a real server on localhost
+"""
+
+import json
+import asyncio
+import threading
+
+import pytest
+
+import bacon_number
+from bacon_server import BaconClient, BaconServer
+
+# 1 - 2 - 3 - 4 with 5 off 2, and a separate 10 - 11 - 12
+CREDITS = [
+    (1, 2, 100),
+    (2, 3, 101),
+    (3, 4, 102),
+    (2, 5, 103),
+    (10, 11, 104),
+    (11, 12, 105),
+]
+
+
+@pytest.fixture
+def server():
+    """
+    runs a BaconServer on its own event loop thread, yields its port
+    """
+    loop = asyncio.new_event_loop()
+    bacon = BaconServer(bacon_number.transform_data(CREDITS), 2, threads=True)
+    port = loop.run_until_complete(bacon.start("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield bacon, port
+    asyncio.run_coroutine_threadsafe(bacon.close(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+
+
+@pytest.fixture
+def client(server):
+    client = BaconClient("127.0.0.1", server[1], timeout=10)
+    yield client
+    client.close()
+
+
+def raw_request(client, method, path, body=None):
+    """
+    sends one request on the client's connection, returns (status, json)
+    """
+    client.connection.request(method, path, body)
+    response = client.connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_path_and_distance(client):
+    assert client.path(1, 4) == [1, 2, 3, 4]
+    assert client.path(5, 5) == [5]
+    assert client.path(1, 12) is None
+    assert client.distance(4, 5) == 3
+    assert client.distance(1, 10) is None
+
+
+def test_batch(client):
+    films = bacon_number.actors_connecting_films(
+        bacon_number.transform_data(CREDITS), 100, 102
+    )
+    results = client.batch(
+        [
+            {"type": "path", "source": 1, "target": 3},
+            {"type": "path", "source": 1, "target": 5},
+            {"type": "distance", "source": 12, "target": 10},
+            {"type": "connecting_films", "film1": 100, "film2": 102},
+        ]
+    )
+    assert results == [
+        {"path": [1, 2, 3]},
+        {"path": [1, 2, 5]},
+        {"distance": 2},
+        {"path": films},
+    ]
+
+
+def test_bad_input(client):
+    assert raw_request(client, "GET", "/path?source=abc&target=1")[0] == 400
+    assert raw_request(client, "GET", "/distance?source=1")[0] == 400
+    assert raw_request(client, "POST", "/batch", b"not json")[0] == 400
+    body = json.dumps({"queries": [{"type": "nope"}]})
+    assert raw_request(client, "POST", "/batch", body)[0] == 400
+    with pytest.raises(ValueError):
+        client.path("abc", 1)
+    assert client.path(1, 2) == [1, 2]  # the connection is still usable
+
+
+def test_unknown_route(client):
+    status, result = raw_request(client, "GET", "/nowhere")
+    assert status == 404
+    assert "error" in result
+    assert client.distance(1, 2) == 1
+
+
+def test_unexpected_error(server, client, monkeypatch):
+    async def broken(query):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(server[0], "answer", broken)
+    status, result = raw_request(client, "GET", "/path?source=1&target=2")
+    assert status == 500
+    assert "boom" in result["error"]
+    assert raw_request(client, "GET", "/health") == (200, {"actors": 8})
+
+
+def test_other_pools_do_not_change_the_graph(client):
+    other = bacon_number.transform_data([(7, 8, 200), (8, 9, 201)])
+    assert bacon_number.batch_paths(other, [(7, 9)]) == [[7, 8, 9]]
+    bacon_number.make_pool(other, 1, threads=True).terminate()
+    assert client.path(2, 1) == [2, 1]
+    assert client.connecting_films(100, 101) == [2]
@@ -0,0 +1,117 @@
+"""
+tests for the flat storage of nd_minesweeper, against a plain reference
+that works on coordinates
+"""
+
+import random
+import itertools
+
+import pytest
+
+import nd_minesweeper
+
+
+def neighbors(dimensions, coordinates):
+    ranges = [
+        range(max(0, coordinate - 1), min(size, coordinate + 2))
+        for coordinate, size in zip(coordinates, dimensions)
+    ]
+    return list(itertools.product(*ranges))
+
+
+def reference_board(dimensions, bombs):
+    """
+    dictionary of coordinates -> value, counting a bomb listed twice twice
+    """
+    board = {cell: 0 for cell in itertools.product(*map(range, dimensions))}
+    for bomb in bombs:
+        board[bomb] = "."
+        for neighbor in neighbors(dimensions, bomb):
+            if board[neighbor] != ".":
+                board[neighbor] += 1
+    return board
+
+
+def reference_dig(dimensions, board, hidden, coordinates):
+    """
+    digs in a dictionary of coordinates -> hidden, returns number revealed
+    """
+    if not hidden[coordinates]:
+        return 0
+    hidden[coordinates] = False
+    revealed = 1
+    agenda = [coordinates] if board[coordinates] == 0 else []
+    visited = set(agenda)
+    while agenda:
+        for neighbor in neighbors(dimensions, agenda.pop()):
+            if neighbor in visited:
+                continue
+            visited.add(neighbor)
+            if hidden[neighbor]:
+                hidden[neighbor] = False
+                revealed += 1
+            if board[neighbor] == 0:
+                agenda.append(neighbor)
+    return revealed
+
+
+def random_game(rng):
+    dimensions = tuple(rng.randint(1, 4) for _ in range(rng.randint(1, 4)))
+    cells = list(itertools.product(*map(range, dimensions)))
+    bombs = rng.sample(cells, rng.randint(0, len(cells) // 4))
+    return dimensions, cells, bombs
+
+
+def test_new_game_matches_reference():
+    rng = random.Random(0)
+    for _ in range(200):
+        dimensions, cells, bombs = random_game(rng)
+        bombs += bombs[: rng.randint(0, len(bombs))]  # some listed twice
+        game = nd_minesweeper.new_game_nd(dimensions, bombs)
+        expected = reference_board(dimensions, bombs)
+        for cell in cells:
+            assert nd_minesweeper.get_value(game["board"], cell) == expected[cell]
+            assert game["board"].get(cell) == expected[cell]
+            assert nd_minesweeper.get_value(game["hidden"], cell) is True
+        nested = game["board"].tolist()
+        assert nd_minesweeper.FlatBoard.from_nested(nested, dimensions) == game["board"]
+
+
+@pytest.mark.parametrize("copies", [1, 127, 128, 130])
+def test_repeated_bombs_fit(copies):
+    game = nd_minesweeper.new_game_nd((2, 2), [(0, 0)] * copies)
+    assert game["board"].tolist() == [[".", copies], [copies, copies]]
+
+
+def test_dig_matches_reference():
+    rng = random.Random(1)
+    for _ in range(200):
+        dimensions, cells, bombs = random_game(rng)
+        game = nd_minesweeper.new_game_nd(dimensions, bombs)
+        board = reference_board(dimensions, bombs)
+        hidden = {cell: True for cell in cells}
+        for cell in rng.sample(cells, min(len(cells), 4)):
+            if game["state"] != "ongoing":
+                break
+            expected = reference_dig(dimensions, board, hidden, cell)
+            assert nd_minesweeper.dig_nd(game, cell) == expected
+            for other in cells:
+                assert game["hidden"].get(other) == hidden[other]
+            if board[cell] == ".":
+                assert game["state"] == "defeat"
+            elif sum(hidden.values()) == len(set(bombs)):
+                assert game["state"] == "victory"
+            else:
+                assert game["state"] == "ongoing"
+
+
+def test_row_views_share_storage():
+    game = nd_minesweeper.new_game_nd((2, 3, 2), [(1, 2, 0)])
+    board = game["board"]
+    row = board[1]
+    assert row[2][0] == "." and row[2][1] == 1 and board[0][0][0] == 0
+    row[0][1] = 7
+    assert board.get((1, 0, 1)) == 7
+    nd_minesweeper.set_value(game["hidden"], (0, 2, 1), False)
+    assert game["hidden"][0][2][1] is False
+    assert game["hidden"].data.count(0) == 1
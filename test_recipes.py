@@ -0,0 +1,171 @@
+"""
+tests for recipes
+"""
+
+import json
+import pickle
+
+import pytest
+
+import recipes
+
+# "nothing" can only be made from an empty recipe, so it has no flat recipes
+# (as with ingredient_mixes([])), even though it costs nothing to make
+EMPTY = [
+    ("compound", "nothing", []),
+    ("compound", "soup", [("nothing", 2), ("water", 1)]),
+    ("compound", "soup", [("water", 3)]),
+    ("compound", "tea", []),
+    ("compound", "tea", [("water", 1)]),
+    ("compound", "meal", [("soup", 1), ("tea", 1)]),
+    ("atomic", "water", 2),
+]
+
+
+def test_empty_recipe_makes_no_flat_recipes():
+    db = recipes.RecipeDB(EMPTY)
+    expected = {
+        "nothing": [],
+        "soup": [{"water": 3}],
+        "tea": [{"water": 1}],
+        "meal": [{"water": 4}],
+    }
+    for item, flat in expected.items():
+        assert recipes.all_flat_recipes(EMPTY, item) == flat
+        assert db.all_flat_recipes(item) == flat
+        assert db.count_flat_recipes(item) == len(flat)
+        assert [recipe for _, recipe in db.cheapest_flat_recipes(item)] == flat
+    assert db.lowest_cost("nothing") == 0
+    assert db.cheapest_flat_recipe("nothing") == {}
+    assert db.lowest_cost("meal") == 2
+
+
+# "stew" and "stock" are made from each other, so there is a cycle
+DINNER = [
+    ("atomic", "water", 1),
+    ("atomic", "bean", 2.5),
+    ("atomic", "salt", 0.25),
+    ("atomic", "crème", 4),
+    ("compound", "stock", [("water", 3), ("salt", 1)]),
+    ("compound", "stock", [("stew", 1), ("water", 1)]),
+    ("compound", "stew", [("stock", 1), ("bean", 2)]),
+    ("compound", "stew", [("bean", 3), ("crème", 1)]),
+    ("compound", "soup", [("stock", 2), ("crème", 1)]),
+    ("compound", "soup", [("stew", 1)]),
+    ("compound", "bread", [("flour", 2)]),
+]
+QUERIES = [
+    (item, forbidden)
+    for item in ("water", "stock", "stew", "soup", "bread", "nothing")
+    for forbidden in (None, ["salt"], ["bean", "stew"], ["crème"])
+]
+
+
+def answers(db):
+    return [
+        (
+            db.lowest_cost(item, forbidden),
+            db.cheapest_flat_recipe(item, forbidden),
+            sorted(map(sorted, db.all_flat_recipes(item, forbidden)), key=str),
+            db.count_flat_recipes(item, forbidden),
+            list(db.cheapest_flat_recipes(item, forbidden, limit=3)),
+        )
+        for item, forbidden in QUERIES
+    ] + [db.cycles()]
+
+
+def test_compiled_recipes_round_trip(tmp_path):
+    expected = answers(recipes.RecipeDB(DINNER))
+    filename = str(tmp_path / "dinner.bin")
+    recipes.compile_recipes(DINNER, filename)
+    with recipes.RecipeDB.open(filename) as db:
+        assert answers(db) == expected
+    db = recipes.load_recipes(filename)
+    assert answers(db) == expected
+    db.add_recipe("bread", [("water", 1), ("bean", 1)])  # copies out of the file
+    db.close()
+    assert db.lowest_cost("bread") == 3.5
+
+
+def test_read_and_convert_recipes(tmp_path):
+    pickled = tmp_path / "dinner.pickle"
+    pickled.write_bytes(pickle.dumps(DINNER))
+    as_json = tmp_path / "dinner.json"
+    as_json.write_text(json.dumps(DINNER), encoding="utf-8")
+    assert recipes.read_recipes(str(pickled)) == DINNER
+    assert recipes.read_recipes(str(as_json)) == DINNER
+    expected = answers(recipes.RecipeDB(DINNER))
+    for source in (pickled, as_json):
+        assert answers(recipes.load_recipes(str(source))) == expected
+        compiled = str(tmp_path / "converted.bin")
+        recipes.convert_recipes(str(source), compiled)
+        with recipes.load_recipes(compiled) as db:
+            assert answers(db) == expected
+
+
+def test_open_rejects_other_files(tmp_path):
+    pickled = tmp_path / "dinner.pickle"
+    pickled.write_bytes(pickle.dumps(DINNER))
+    short = tmp_path / "short.bin"
+    short.write_bytes(recipes.RECIPE_MAGIC)
+    for filename in (pickled, short):
+        with pytest.raises(ValueError):
+            recipes.RecipeDB.open(str(filename))
+
+
+def test_incremental_updates_match_rebuild():
+    db = recipes.RecipeDB(DINNER)
+    answers(db)  # fills the cached tables that the updates have to keep right
+    current = list(DINNER)
+    changes = [
+        ("update", "pepper", None),  # an item it has never seen
+        ("update", "water", 0.5),
+        ("add", "bread", [("water", 1), ("bean", 1)]),
+        ("update", "flour", 1),
+        ("remove", "stew", [("bean", 3), ("crème", 1)]),
+        ("add", "flour", [("bean", 1)]),
+        ("update", "flour", None),
+        ("remove", "stock", [("stew", 1), ("water", 1)]),
+        ("update", "salt", 10),
+    ]
+    for kind, name, value in changes:
+        if kind == "update":
+            db.update_atomic_cost(name, value)
+            current = [entry for entry in current if entry[:2] != ("atomic", name)]
+            if value is not None:
+                current.append(("atomic", name, value))
+        elif kind == "add":
+            db.add_recipe(name, value)
+            current.append(("compound", name, value))
+        else:
+            db.remove_recipe(name, value)
+            current.remove(("compound", name, value))
+        assert answers(db) == answers(recipes.RecipeDB(current)), (kind, name)
+        assert db.count_flat_recipes(name) == len(db.all_flat_recipes(name))
+    with pytest.raises(KeyError):
+        db.remove_recipe("stew", [("bean", 3), ("crème", 1)])
+
+
+def test_cycles_are_costed_and_reported():
+    db = recipes.RecipeDB(DINNER)
+    [cycle] = db.cycles()
+    assert cycle["items"] == ["stew", "stock"]
+    assert cycle["cycle"] in (["stew", "stock", "stew"], ["stock", "stew", "stock"])
+    assert db.lowest_cost("stock") == 3.25
+    assert db.lowest_cost("stew") == 8.25
+    assert db.lowest_cost("soup") == 8.25
+    assert db.lowest_cost("stock", ["salt"]) == 12.5  # only round through stew
+    assert db.cheapest_flat_recipe("stock", ["salt"]) == {
+        "bean": 3,
+        "crème": 1,
+        "water": 1,
+    }
+    assert db.lowest_cost("stock", ["salt", "crème"]) is None
+    # a flat recipe never goes round the cycle back to the item it is for
+    assert sorted(map(sorted, db.all_flat_recipes("stock"))) == [
+        ["bean", "crème", "water"],
+        ["salt", "water"],
+    ]
+    assert db.count_flat_recipes("stock") == 2
+    assert recipes.lowest_cost(DINNER, "stew") == 8.25
+    assert recipes.recipe_cycles(DINNER) == db.cycles()
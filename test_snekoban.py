@@ -0,0 +1,217 @@
+"""
+tests for the snekoban solvers
+"""
+
+import random
+import signal
+
+import pytest
+
+import snekoban
+from snekoban_batch import LevelTimeout
+from snekoban_benchmark import HAND_WRITTEN, generate_level, parse_level, run_solver
+
+# the player is shut in a room with a computer in its only doorway, which can
+# only be pushed further away from the target
+BOXED_IN = """
+########
+#.  ####
+#   $  #
+#@  ####
+#   ####
+########
+"""
+
+
+def reference_length(game):
+    """
+    length of a shortest solution found by plain bfs with no pruning, or None
+    """
+    targets = game["targets"]
+    start = snekoban.game_state(game)
+    if not targets or len(start[1]) < len(targets):
+        return None
+    on_targets = len(targets & start[1])
+    if on_targets == len(targets):
+        return 0
+    stats = {"nodes_expanded": 0, "peak_frontier": 0}
+    solution = snekoban._solve_bfs(game, start, on_targets, None, stats)
+    return None if solution is None else len(solution)
+
+
+def play(game, moves):
+    for move in moves:
+        game = snekoban.step_game(game, move)
+    return game
+
+
+def random_level(rng):
+    """
+    small level with computers, targets and walls placed anywhere, so it is
+    often unsolvable
+    """
+    rows, cols = rng.randint(3, 6), rng.randint(3, 6)
+    cells = [(row, col) for row in range(rows) for col in range(cols)]
+    rng.shuffle(cells)
+    num_computers = rng.randint(1, 2)
+    level = [[[] for _ in range(cols)] for _ in range(rows)]
+    row, col = cells.pop()
+    level[row][col].append("player")
+    for _ in range(num_computers):
+        row, col = cells.pop()
+        level[row][col].append("computer")
+    for row, col in rng.sample(cells, num_computers):
+        level[row][col].append("target")
+    for row, col in cells:
+        if not level[row][col] and rng.random() < 0.2:
+            level[row][col].append("wall")
+    return level
+
+
+def check_modes_agree(level):
+    game = snekoban.new_game(level)
+    expected = reference_length(game)
+    for mode in snekoban.SOLVERS:
+        solution = snekoban.solve_puzzle(game, mode)
+        if expected is None:
+            assert solution is None, mode
+            continue
+        assert solution is not None, mode
+        assert snekoban.victory_check(play(game, solution)), mode
+        if mode == "push":  # fewest pushes, not fewest moves
+            assert len(solution) >= expected
+        else:
+            assert len(solution) == expected, mode
+
+
+@pytest.mark.parametrize("name", ["corridor", "two_rooms", "square"])
+def test_modes_agree_hand_written(name):
+    check_modes_agree(parse_level(HAND_WRITTEN[name]))
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_modes_agree_generated(seed):
+    check_modes_agree(generate_level(7, 7, 2, 300, seed=seed))
+
+
+def test_modes_agree_random():
+    rng = random.Random(0)
+    for _ in range(300):
+        check_modes_agree(random_level(rng))
+
+
+@pytest.mark.parametrize("mode", sorted(snekoban.SOLVERS))
+def test_boxed_in_unsolvable(mode):
+    stats = {}
+    game = snekoban.new_game(parse_level(BOXED_IN))
+    assert snekoban.solve_puzzle(game, mode, stats) is None
+    assert stats["nodes_expanded"] <= 100
+
+
+def test_idastar_revisits_bounded(monkeypatch):
+    # without the up front check, only the table keeps idastar from trying
+    # every path around the room
+    monkeypatch.setattr(snekoban, "IDASTAR_CHECK_LIMIT", 0)
+    stats = {}
+    game = snekoban.new_game(parse_level(BOXED_IN))
+    assert snekoban.solve_puzzle(game, "idastar", stats) is None
+    assert stats["nodes_expanded"] < 5000
+
+
+def test_idastar_table_overflow(monkeypatch):
+    monkeypatch.setattr(snekoban, "IDASTAR_TABLE_SIZE", 10)
+    game = snekoban.new_game(parse_level(HAND_WRITTEN["two_rooms"]))
+    assert len(snekoban.solve_puzzle(game, "idastar")) == 22
+
+
+def test_benchmark_timeout_without_handler():
+    previous = signal.getsignal(signal.SIGALRM)
+    level = generate_level(10, 10, 3, 1000, seed="0:10")
+    with pytest.raises(LevelTimeout):
+        run_solver(level, "bfs", 0.01)
+    assert signal.getsignal(signal.SIGALRM) == previous
+
+
+def solved_two_rooms(table):
+    game = snekoban.new_game(parse_level(HAND_WRITTEN["two_rooms"]))
+    return game, snekoban.solve_puzzle(game, "astar", table=table)
+
+
+def test_table_answers_along_known_solution():
+    table = snekoban.TranspositionTable()
+    game, solution = solved_two_rooms(table)
+    for index in range(len(solution) + 1):
+        stats = {}
+        position = play(game, solution[:index])
+        assert snekoban.solve_puzzle(position, "bfs", stats, table) == solution[index:]
+        assert stats["nodes_expanded"] == 0
+
+
+def test_table_falls_back_to_search_off_its_path():
+    table = snekoban.TranspositionTable()
+    game, solution = solved_two_rooms(table)
+    for move in snekoban.direction_vector:
+        position = snekoban.step_game(game, move)
+        if move != solution[0] and position["player"] != game["player"]:
+            break
+    assert table.solution(position) == (False, None)
+    stats = {}
+    detour = snekoban.solve_puzzle(position, "bfs", stats, table)
+    assert stats["nodes_expanded"] > 0
+    assert len(detour) == reference_length(position)
+    assert snekoban.victory_check(play(position, detour))
+    assert table.solution(position) == (True, detour)  # recorded for next time
+
+
+def test_table_eviction_and_unsolvable_levels():
+    table = snekoban.TranspositionTable(maxsize=5)
+    game, solution = solved_two_rooms(table)
+    assert len(table.entries) == 5
+    assert table.solution(game) == (False, None)  # the start was evicted
+    near_end = play(game, solution[:-4])
+    assert table.solution(near_end) == (True, solution[-4:])
+
+    boxed_in = snekoban.new_game(parse_level(BOXED_IN))
+    assert snekoban.solve_puzzle(boxed_in, "bfs", table=table) is None
+    assert table.solution(boxed_in) == (True, None)
+
+
+def test_table_save_and_load(tmp_path):
+    table = snekoban.TranspositionTable(maxsize=100)
+    game, solution = solved_two_rooms(table)
+    filename = tmp_path / "table.pickle"
+    table.save(filename)
+    loaded = snekoban.TranspositionTable.load(filename)
+    assert loaded.maxsize == 100
+    assert loaded.entries == table.entries
+    assert loaded.solution(game) == (True, solution)
+
+
+def test_following_hints_searches_once():
+    table = snekoban.TranspositionTable()
+    game = snekoban.new_game(parse_level(HAND_WRITTEN["two_rooms"]))
+    moves = []
+    while not snekoban.victory_check(game):
+        move = snekoban.hint(game, table)
+        if not moves:
+            known = len(table.entries)
+        assert len(table.entries) == known
+        moves.append(move)
+        game = snekoban.step_game(game, move)
+    assert len(moves) == 22
+    assert snekoban.hint(game, table) is None
+
+
+def test_replay_diffs_patch_frames():
+    game = snekoban.new_game(parse_level(HAND_WRITTEN["square"]))
+    solution = snekoban.solve_puzzle(game, "astar")
+    frame = snekoban.dump_game(game)
+    rows, cols = game["dimension"]
+    for move, next_game, diff in snekoban.replay(game, solution):
+        for (row, col), contents in diff.items():
+            frame[row][col] = contents
+        assert frame == snekoban.dump_game(next_game), move
+    assert snekoban.victory_check(next_game)
+    for row in range(rows):
+        for col in range(cols):
+            assert snekoban.cell_contents(next_game, (row, col)) == frame[row][col]
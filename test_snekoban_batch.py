@@ -0,0 +1,77 @@
+"""
+tests for solving folders of snekoban levels
+"""
+
+import os
+import json
+import signal
+import multiprocessing
+
+import pytest
+
+import snekoban
+import snekoban_batch
+from snekoban_benchmark import HAND_WRITTEN, parse_level
+
+
+@pytest.fixture
+def levels(tmp_path):
+    """
+    folder with two levels and a json file that isn't a level
+    """
+    for name in ("corridor", "square"):
+        level = parse_level(HAND_WRITTEN[name])
+        (tmp_path / f"{name}.json").write_text(json.dumps(level))
+    (tmp_path / "notes.json").write_text(json.dumps({"not": "a level"}))
+    (tmp_path / "broken.json").write_text("[[[")
+    return tmp_path
+
+
+def test_bad_files_become_errors(levels):
+    results_file = str(levels / "results.json")
+    summary = snekoban_batch.solve_levels([str(levels)], results_file=results_file)
+    statuses = {
+        os.path.basename(result["file"]): result["status"]
+        for result in summary["results"]
+    }
+    assert statuses == {
+        "broken.json": "error",
+        "corridor.json": "solved",
+        "notes.json": "error",
+        "square.json": "solved",
+    }
+    assert summary["counts"]["error"] == 2
+
+    # the results file sits in the folder but isn't read as a level
+    again = snekoban_batch.solve_levels([str(levels)], results_file=results_file)
+    assert again["cached"] == 2
+    assert len(again["results"]) == 4
+    assert len(snekoban_batch.load_results(results_file)) == 3
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork", reason="patches the workers"
+)
+def test_killed_worker_only_loses_its_level(levels, monkeypatch):
+    solve_puzzle = snekoban.solve_puzzle
+
+    def killed_on_square(game, mode, stats=None):
+        if len(game["targets"]) == 4:
+            os.kill(os.getpid(), signal.SIGKILL)
+        return solve_puzzle(game, mode, stats)
+
+    monkeypatch.setattr(snekoban, "solve_puzzle", killed_on_square)
+    results_file = str(levels / "results.json")
+    summary = snekoban_batch.solve_levels(
+        [str(levels / "corridor.json"), str(levels / "square.json")],
+        processes=1,
+        results_file=results_file,
+    )
+    corridor, square = summary["results"]
+    assert corridor["status"] == "solved"
+    assert square["status"] == "error" and "-9" in square["error"]
+    saved = snekoban_batch.load_results(results_file)
+    assert sorted(result["status"] for result in saved.values()) == [
+        "error",
+        "solved",
+    ]